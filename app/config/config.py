@@ -1,4 +1,6 @@
 import os
+from typing import Tuple
+
 from dotenv import load_dotenv
 
 dotenv_path = os.path.join(os.path.dirname
@@ -10,3 +12,89 @@ POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT")
 POSTGRES_DB = os.getenv("POSTGRES_DB")
+
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                    '..', 'data', 'app.db'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 65536))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+
+SHARE_SKETCHES_ENABLED = os.getenv("SHARE_SKETCHES_ENABLED", "true").lower() == "true"
+SHARE_SKETCH_PRECISION = int(os.getenv("SHARE_SKETCH_PRECISION", 12))
+SHARE_SKETCH_CAPACITY = int(os.getenv("SHARE_SKETCH_CAPACITY", 1024))
+SHARE_SKETCH_REFRESH_SECONDS = int(os.getenv("SHARE_SKETCH_REFRESH_SECONDS", 0))
+
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000))
+
+ACCESS_INDEX_ENABLED = os.getenv("ACCESS_INDEX_ENABLED", "true").lower() == "true"
+ACCESS_INDEX_CONFIRM_DENIALS = os.getenv("ACCESS_INDEX_CONFIRM_DENIALS", "true").lower() == "true"
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+FASTAPI_PORT = int(os.getenv("FASTAPI_PORT", 8000))
+# Workers app.server starts (0 = one per CPU). The launcher exports the
+# resolved count to its workers as WEB_WORKER_PROCESSES; any other process
+# (python -m app.main, the tests) runs alone and keeps its whole pool.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 0))
+WEB_WORKER_PROCESSES = int(os.getenv("WEB_WORKER_PROCESSES", 1))
+WEB_KEEPALIVE_SECONDS = int(os.getenv("WEB_KEEPALIVE_SECONDS", 5))
+WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", 30))
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", 0))
+
+# Connections the database accepts from all worker processes together
+# (0 = no limit). Each worker's pool is capped at its share of the budget.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 0))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", 5))
+
+_CONFIGURED_POOL = (DB_POOL_SIZE, DB_MAX_OVERFLOW)
+
+
+def worker_pool_limits(processes: int) -> Tuple[int, int]:
+    """Return the pool size and overflow of one of `processes` workers sharing DB_MAX_CONNECTIONS."""
+    pool_size, max_overflow = _CONFIGURED_POOL
+    if DB_MAX_CONNECTIONS <= 0:
+        return pool_size, max_overflow
+
+    connections = max((DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS) // processes, 1)
+    pool_size = min(pool_size, connections)
+    return pool_size, min(max_overflow, connections - pool_size)
+
+
+DB_POOL_SIZE, DB_MAX_OVERFLOW = worker_pool_limits(WEB_WORKER_PROCESSES)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 100))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                              '..', 'logs', 'app.log'))
+# Unix socket of the launcher's log writer; app.server sets it for its workers.
+LOG_SOCKET = os.getenv("LOG_SOCKET", "")
+
+# "auto" caches only in a single worker process: a write made through another
+# worker would stay invisible in this one's cache until the entry expires.
+_ENTITY_CACHE = os.getenv("ENTITY_CACHE_ENABLED", "auto").lower()
+ENTITY_CACHE_ENABLED = WEB_WORKER_PROCESSES <= 1 if _ENTITY_CACHE == "auto" else _ENTITY_CACHE == "true"
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", 10000))
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv("ENTITY_CACHE_TTL_SECONDS", 30))
+
+DB_CONNECT_RETRIES = int(os.getenv("DB_CONNECT_RETRIES", 10))
+DB_CONNECT_BACKOFF_SECONDS = float(os.getenv("DB_CONNECT_BACKOFF_SECONDS", 0.5))
+DB_CONNECT_BACKOFF_MAX_SECONDS = float(os.getenv("DB_CONNECT_BACKOFF_MAX_SECONDS", 10))
+DB_SKIP_DDL = os.getenv("DB_SKIP_DDL", "false").lower() == "true"
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", DB_POOL_SIZE))
+
+DB_REPLICA_URL = os.getenv("DB_REPLICA_URL") or None
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
@@ -1,28 +1,244 @@
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config.config import (POSTGRES_USER, POSTGRES_PASSWORD,
-                               POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB)
+                               POSTGRES_HOST, POSTGRES_PORT, POSTGRES_DB,
+                               DB_BACKEND, SQLITE_PATH, SQLITE_BUSY_TIMEOUT_MS,
+                               SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE,
+                               DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                               DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+                               DB_REPLICA_URL, REPLICA_RETRY_SECONDS)
+from app.utils.pool_stats import PoolStats
+from app.utils.profiling import register_query_hooks
+from app.utils.read_your_writes import reads_from_primary
+
 
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
-SQLALCHEMY_DATABASE_URL = (f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
-                           f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+if DB_BACKEND == "sqlite":
+    SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{SQLITE_PATH}"
+    os.makedirs(os.path.dirname(os.path.abspath(SQLITE_PATH)), exist_ok=True)
+else:
+    SQLALCHEMY_DATABASE_URL = (f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
+                               f"{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}")
+
+# aiosqlite defaults to NullPool for file databases; a queue pool keeps the
+# pool settings and statistics meaningful and runs the pragmas once per connection.
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL,
+                             poolclass=AsyncAdaptedQueuePool,
+                             pool_size=DB_POOL_SIZE,
+                             max_overflow=DB_MAX_OVERFLOW,
+                             pool_timeout=DB_POOL_TIMEOUT,
+                             pool_recycle=DB_POOL_RECYCLE,
+                             pool_pre_ping=DB_POOL_PRE_PING)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe in
+    # WAL mode and avoids an fsync per commit. busy_timeout makes concurrent
+    # writers wait for the lock instead of failing with "database is locked".
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+register_query_hooks(engine.sync_engine)
+
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession,
+                                  autoflush=False, expire_on_commit=False)
+
+pool_stats = PoolStats()
+
+# Optional read replica. Read-only routes use it through get_read_db; writes,
+# shares and startup loading always go to the primary.
+replica_engine = None
+ReplicaSessionLocal = None
+
+if DB_REPLICA_URL:
+    replica_engine = create_async_engine(DB_REPLICA_URL,
+                                         poolclass=AsyncAdaptedQueuePool,
+                                         pool_size=DB_POOL_SIZE,
+                                         max_overflow=DB_MAX_OVERFLOW,
+                                         pool_timeout=DB_POOL_TIMEOUT,
+                                         pool_recycle=DB_POOL_RECYCLE,
+                                         pool_pre_ping=DB_POOL_PRE_PING)
+    register_query_hooks(replica_engine.sync_engine)
+    ReplicaSessionLocal = async_sessionmaker(bind=replica_engine, class_=AsyncSession,
+                                             autoflush=False, expire_on_commit=False)
+
+replica_pool_stats = PoolStats()
+
+# monotonic() time until which the replica is skipped after a failed checkout.
+_replica_down_until = 0.0
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async def create_database():
+    """Create the missing tables and upgrade the ones an earlier version created."""
+    # Imported here: the upgrade needs the models, which import this module.
+    from app.database.upgrade import upgrade_schema
 
+    async with engine.begin() as connection:
+        await upgrade_schema(connection)
 
-def create_database():
-    Base.metadata.create_all(bind=engine)
 
+async def wait_for_database(attempts: int, backoff: float, max_backoff: float):
+    """
+    Wait until the database accepts connections, retrying with exponential backoff.
+
+    Raises:
+        Exception: The last connection error, once all attempts have failed.
+    """
+    delay = backoff
+
+    for attempt in range(1, attempts + 1):
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return
+
+        except Exception as e:
+            if attempt >= attempts:
+                raise e
+
+            logger.warning("Database not reachable (attempt %d/%d), retrying in %.1fs - %s",
+                           attempt, attempts, delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_backoff)
+
+
+async def warm_pool(connections: int) -> int:
+    """
+    Open up to `connections` pooled connections and return them to the pool idle.
+
+    Returns:
+        int: The number of connections opened, at most the pool size.
+    """
+    if isinstance(engine.pool, QueuePool):
+        connections = min(connections, engine.pool.size())
+
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            await stack.enter_async_context(engine.connect())
+
+    return max(connections, 0)
+
+
+async def _checkout(session_factory: async_sessionmaker, stats: PoolStats) -> AsyncSession:
+    db = session_factory()
+    started = time.perf_counter()
 
-def get_db():
-    db = SessionLocal()
     try:
+        await db.connection()
+
+    except PoolTimeoutError:
+        stats.record_timeout()
+        await db.close()
+        raise
+
+    except Exception:
+        await db.close()
+        raise
+
+    stats.record_wait(time.perf_counter() - started)
+    return db
+
+
+@asynccontextmanager
+async def open_session() -> AsyncIterator[AsyncSession]:
+    """
+    Open a session and check out its connection up front, recording the pool wait.
+
+    get_db uses it for every request; routes that can often answer without
+    the database (e.g. from a cache) call it only when they need to.
+    """
+    async with await _checkout(SessionLocal, pool_stats) as db:
+        yield db
+
+
+def replica_available(request: Optional[Request] = None) -> bool:
+    """Whether a read for this request would be served by the replica."""
+    return (ReplicaSessionLocal is not None and time.monotonic() >= _replica_down_until
+            and not reads_from_primary(request))
+
+
+def is_replica(db: AsyncSession) -> bool:
+    return db.info.get("replica", False)
+
+
+@asynccontextmanager
+async def open_read_session(request: Optional[Request] = None) -> AsyncIterator[AsyncSession]:
+    """
+    Open a session for a read-only request, on the replica when one is configured.
+
+    Clients that wrote within the last READ_YOUR_WRITES_SECONDS read from the
+    primary so they see their own changes. If the replica cannot hand out a
+    connection, it is skipped for REPLICA_RETRY_SECONDS and the primary is used.
+    """
+    global _replica_down_until
+
+    if replica_available(request):
+        try:
+            replica_db = await _checkout(ReplicaSessionLocal, replica_pool_stats)
+
+        except Exception as e:
+            _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+            logger.warning("Replica unavailable, reading from the primary for %.0fs - %s", REPLICA_RETRY_SECONDS, e)
+
+        else:
+            replica_db.info["replica"] = True
+            async with replica_db:
+                yield replica_db
+            return
+
+    async with open_session() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_db():
+    async with open_session() as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    async with open_read_session(request) as db:
+        yield db
+
+
+def get_pool_stats() -> dict:
+    stats = {
+        **pool_stats.snapshot(engine.pool),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+    if replica_engine is not None:
+        stats["replica"] = {
+            **replica_pool_stats.snapshot(replica_engine.pool),
+            "available": time.monotonic() >= _replica_down_until,
+        }
+
+    return stats
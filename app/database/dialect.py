@@ -0,0 +1,24 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Insert
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(table: Table, db: AsyncSession) -> Insert:
+    """
+    The INSERT construct of the dialect the session is bound to.
+
+    Both supported backends spell ON CONFLICT the same way, but the construct
+    lives in each dialect's own module, so it is picked from the session's bind.
+    """
+    return _INSERTS[db.get_bind().dialect.name](table)
+
+
+def insert_ignore(table: Table, db: AsyncSession) -> Insert:
+    """INSERT ... ON CONFLICT DO NOTHING for the dialect the session is bound to."""
+    return dialect_insert(table, db).on_conflict_do_nothing()
@@ -0,0 +1,100 @@
+from typing import List, Set, Tuple
+
+from sqlalchemy import select, tuple_, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import ACCESS_INDEX_CONFIRM_DENIALS, STREAM_CHUNK_SIZE
+from app.models.file_group import file_group
+from app.models.file_user import file_user
+from app.models.user_group import user_group
+from app.utils.access_index import AccessIndex
+
+# Process-wide access index. The share operations update it after each
+# commit. Shares committed by other worker processes are not seen until the
+# next load, which is why denials are confirmed against the database unless
+# ACCESS_INDEX_CONFIRM_DENIALS is turned off.
+access_index = AccessIndex()
+
+# Denials are confirmed this many pairs per query. Each pair binds four
+# parameters (two per UNION branch), which keeps a query well under the
+# 32767 bind parameters asyncpg and SQLite accept.
+ACCESS_CONFIRM_CHUNK_SIZE = 2000
+
+
+async def load_access_index_db(db: AsyncSession):
+    index = AccessIndex()
+
+    # Group memberships first, so each file_group row expands to every member.
+    rows = await db.stream(select(user_group.c.group_id, user_group.c.user_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for group_id, user_id in rows:
+        index.share_group_with_users(group_id, [user_id])
+
+    rows = await db.stream(select(file_group.c.file_id, file_group.c.group_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for file_id, group_id in rows:
+        index.share_file_with_groups(file_id, [group_id])
+
+    rows = await db.stream(select(file_user.c.file_id, file_user.c.user_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for file_id, user_id in rows:
+        index.share_file_with_users(file_id, [user_id])
+
+    access_index.replace(index)
+
+
+def check_access_index(checks: List[Tuple[int, int]]) -> Tuple[List[bool], List[Tuple[int, int]]]:
+    """
+    Answer (file_id, user_id) access checks from the in-memory index.
+
+    Args:
+        checks (List[Tuple[int, int]]): The (file_id, user_id) pairs to check.
+
+    Returns:
+        Tuple[List[bool], List[Tuple[int, int]]]: The answers, in order, and the
+        distinct denied pairs that still have to be confirmed with
+        confirm_access_db. Every pair is denied while the index is not loaded.
+    """
+    if access_index.ready:
+        allowed = [access_index.can_access(file_id, user_id) for file_id, user_id in checks]
+        if not ACCESS_INDEX_CONFIRM_DENIALS:
+            return allowed, []
+    else:
+        allowed = [False] * len(checks)
+
+    denied = list({check for check, is_allowed in zip(checks, allowed) if not is_allowed})
+    return allowed, denied
+
+
+async def confirm_access_db(denied: List[Tuple[int, int]], db: AsyncSession) -> Set[Tuple[int, int]]:
+    """
+    Look denied (file_id, user_id) pairs up in the database, directly or through a group.
+
+    Pairs found are added to the index, so the next check is answered from memory.
+
+    Returns:
+        Set[Tuple[int, int]]: The pairs that do have access.
+    """
+    try:
+        granted = set()
+
+        for start in range(0, len(denied), ACCESS_CONFIRM_CHUNK_SIZE):
+            chunk = denied[start:start + ACCESS_CONFIRM_CHUNK_SIZE]
+
+            direct_shares = (select(file_user.c.file_id, file_user.c.user_id)
+                             .filter(tuple_(file_user.c.file_id, file_user.c.user_id).in_(chunk)))
+            group_shares = (select(file_group.c.file_id, user_group.c.user_id)
+                            .join(user_group, user_group.c.group_id == file_group.c.group_id)
+                            .filter(tuple_(file_group.c.file_id, user_group.c.user_id).in_(chunk)))
+
+            result = await db.execute(union(direct_shares, group_shares))
+            granted.update((file_id, user_id) for file_id, user_id in result)
+
+        if access_index.ready:
+            for file_id, user_id in granted:
+                access_index.share_file_with_users(file_id, [user_id])
+
+        return granted
+
+    except Exception as e:
+        raise e
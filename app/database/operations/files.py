@@ -1,33 +1,145 @@
 from fastapi import HTTPException, status
-from sqlalchemy import text
-from sqlalchemy.orm import Session
-from typing import List
-
+from sqlalchemy import Row, insert, select, tuple_, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.config.config import BULK_INSERT_CHUNK_SIZE
+from app.database.dialect import insert_ignore
+from app.database.operations.access_index import access_index
+from app.database.operations.risk_counts import count_new_files
+from app.database.operations.share_counts import count_new_direct_users, count_new_group_shares
+from app.database.operations.share_sketches import share_sketches
 from app.models.file import File
+from app.models.file_group import file_group
+from app.models.file_risk_count import file_risk_count
+from app.models.file_user import file_user
 from app.models.user import User
 from app.models.group import Group
-from app.schemas.file import (FileCreate,
-                              FileTopSharedResponse)
-from app.schemas.user import (UserShared)
+from app.models.user_group import user_group
+from app.schemas.file import (FileCreate, FileResponse, FileRiskBucket, FileRiskHistogramResponse, FileSort,
+                              FileTopSharedApproximateResponse, FileTopSharedEstimate, FileTopSharedResponse,
+                              FileExposureResponse)
+from app.schemas.share import ShareAcknowledgement, ShareBatchResponse, build_share_results
+from app.utils.entity_cache import file_cache
+
+
+# FileResponse only needs the ids of the users and groups a file is shared
+# with, so both collections are batch loaded with one IN query each and any
+# other relationship access raises instead of issuing a lazy SELECT per row.
+FILE_RESPONSE_LOAD_OPTIONS = (
+    selectinload(File.users).load_only(User.id),
+    selectinload(File.groups).load_only(Group.id),
+    raiseload("*"),
+)
+
+# The fast path looks up the users and groups of this many files per IN query,
+# the same batch size selectinload uses.
+ROWS_IN_CHUNK_SIZE = 500
+
+FILE_RESPONSE_FIELDS = tuple(FileResponse.model_fields)
+FILE_RELATIONSHIPS = ("users", "groups")
 
+MAX_RISK = 100
 
-async def create_file_db(file: FileCreate, db: Session):
+
+async def create_file_db(file: FileCreate, db: AsyncSession):
     try:
-        db_file = File(**file.dict())
+        db_file = File(**file.dict(), users=[], groups=[])
         db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        await count_new_files([db_file.risk], db)
+        await db.commit()
 
         return db_file
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-async def get_files_db(db: Session):
+async def bulk_create_files_db(records: AsyncIterator[FileCreate], db: AsyncSession) -> List[int]:
     try:
-        files = db.query(File).all()
+        file_ids = []
+        chunk = []
+
+        async for record in records:
+            chunk.append(record.model_dump())
+
+            if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                file_ids.extend(await _insert_files(chunk, db))
+                chunk = []
+
+        if chunk:
+            file_ids.extend(await _insert_files(chunk, db))
+
+        await db.commit()
+
+        return file_ids
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def _insert_files(chunk: List[dict], db: AsyncSession) -> List[int]:
+    result = await db.execute(insert(File).returning(File.id, sort_by_parameter_order=True), chunk)
+    file_ids = list(result.scalars())
+
+    await count_new_files((record["risk"] for record in chunk), db)
+    return file_ids
+
+
+class FileFilter(NamedTuple):
+    """Risk range and order of a file list. Sorted by risk, the keyset cursor is (after_risk, after_id)."""
+    min_risk: Optional[int] = None
+    max_risk: Optional[int] = None
+    sort: FileSort = FileSort.id
+    after_risk: Optional[int] = None
+
+
+def _paginate_files(query, after_id: Optional[int], limit: Optional[int], file_filter: FileFilter):
+    """
+    Filter a file query by risk range and order it for keyset paging.
+
+    Sorted by risk, both directions are served by the (risk, id) index;
+    descending order walks it backwards.
+    """
+    if file_filter.min_risk is not None:
+        query = query.filter(File.risk >= file_filter.min_risk)
+
+    if file_filter.max_risk is not None:
+        query = query.filter(File.risk <= file_filter.max_risk)
+
+    if file_filter.sort == FileSort.risk:
+        query = query.order_by(File.risk, File.id)
+        if after_id is not None:
+            query = query.filter(tuple_(File.risk, File.id) > tuple_(file_filter.after_risk, after_id))
+
+    elif file_filter.sort == FileSort.risk_desc:
+        query = query.order_by(File.risk.desc(), File.id.desc())
+        if after_id is not None:
+            query = query.filter(tuple_(File.risk, File.id) < tuple_(file_filter.after_risk, after_id))
+
+    else:
+        query = query.order_by(File.id)
+        if after_id is not None:
+            query = query.filter(File.id > after_id)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+def _files_page_query(after_id: Optional[int], limit: Optional[int], file_filter: FileFilter):
+    return _paginate_files(select(File).options(*FILE_RESPONSE_LOAD_OPTIONS), after_id, limit, file_filter)
+
+
+async def get_files_db(db: AsyncSession, after_id: Optional[int] = None, limit: Optional[int] = None,
+                       file_filter: FileFilter = FileFilter()):
+    try:
+        result = await db.execute(_files_page_query(after_id, limit, file_filter))
+        files = result.scalars().all()
 
         return files
 
@@ -35,15 +147,93 @@ async def get_files_db(db: Session):
         raise e
 
 
-async def get_file_by_id_db(file_id: int, db: Session):
+async def stream_files_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                          limit: Optional[int] = None, file_filter: FileFilter = FileFilter()) -> AsyncIterator[File]:
+    query = _files_page_query(after_id, limit, file_filter).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+
+    async for chunk in result.scalars().partitions():
+        for file in chunk:
+            yield file
+
+
+def _file_rows_page_query(after_id: Optional[int], limit: Optional[int], file_filter: FileFilter):
+    return _paginate_files(select(File.id, File.name, File.risk), after_id, limit, file_filter)
+
+
+async def _shared_ids_by_file(column, file_ids: List[int], db: AsyncSession) -> Dict[int, List[dict]]:
+    table = column.table
+    result = await db.execute(select(table.c.file_id, column).where(table.c.file_id.in_(file_ids))
+                              .order_by(table.c.file_id, column))
+
+    shared: Dict[int, List[dict]] = {}
+    for file_id, shared_id in result:
+        shared.setdefault(file_id, []).append({"id": shared_id})
+    return shared
+
+
+async def _file_rows(rows: Sequence, db: AsyncSession,
+                     fields: Sequence[str] = FILE_RESPONSE_FIELDS) -> List[dict]:
+    """
+    Turn (id, name, risk) rows into plain dicts holding `fields`, in FileResponse field order.
+
+    The users and groups of each chunk of files are read as id pairs straight
+    from the association tables, without loading any ORM objects, and only
+    when they are among `fields`.
+    """
+    files = []
+    for start in range(0, len(rows), ROWS_IN_CHUNK_SIZE):
+        chunk = rows[start:start + ROWS_IN_CHUNK_SIZE]
+        file_ids = [row.id for row in chunk]
+        users = await _shared_ids_by_file(file_user.c.user_id, file_ids, db) if "users" in fields else {}
+        groups = await _shared_ids_by_file(file_group.c.group_id, file_ids, db) if "groups" in fields else {}
+
+        for row in chunk:
+            values = {"name": row.name, "risk": row.risk,
+                      "users": users.get(row.id, []), "groups": groups.get(row.id, [])}
+            files.append({field: values[field] for field in fields})
+    return files
+
+
+async def get_file_rows_db(db: AsyncSession, after_id: Optional[int] = None, limit: Optional[int] = None,
+                           fields: Sequence[str] = FILE_RESPONSE_FIELDS,
+                           file_filter: FileFilter = FileFilter()) -> Tuple[List[dict], Optional[Row]]:
+    """
+    Fetch a page of files as plain dicts, for encoding without Pydantic.
+
+    Returns:
+        Tuple[List[dict], Optional[Row]]: The files, and the (id, name, risk) row of the last one.
+    """
+    try:
+        rows = (await db.execute(_file_rows_page_query(after_id, limit, file_filter))).all()
+
+        return await _file_rows(rows, db, fields), rows[-1] if rows else None
+
+    except Exception as e:
+        raise e
+
+
+async def stream_file_rows_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                              limit: Optional[int] = None, fields: Sequence[str] = FILE_RESPONSE_FIELDS,
+                              file_filter: FileFilter = FileFilter()) -> AsyncIterator[dict]:
+    query = _file_rows_page_query(after_id, limit, file_filter).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+
+    async for chunk in result.partitions():
+        for file in await _file_rows(chunk, db, fields):
+            yield file
+
+
+async def get_file_row_db(file_id: int, db: AsyncSession, fields: Sequence[str]) -> dict:
     try:
-        file = db.query(File).filter(File.id == file_id).first()
+        result = await db.execute(select(File.id, File.name, File.risk).filter(File.id == file_id))
+        row = result.first()
 
-        if file is None:
+        if row is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="File not found")
 
-        return file
+        return (await _file_rows([row], db, fields))[0]
 
     except HTTPException as http_exc:
         raise http_exc
@@ -52,115 +242,288 @@ async def get_file_by_id_db(file_id: int, db: Session):
         raise e
 
 
-async def share_file_with_user_db(file_id: int, user_id: int, db: Session):
+async def get_file_by_id_db(file_id: int, db: AsyncSession):
     try:
-        file = db.query(File).filter(File.id == file_id).first()
-        user = db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(select(File).filter(File.id == file_id)
+                                  .options(*FILE_RESPONSE_LOAD_OPTIONS))
+        file = result.scalars().first()
 
         if file is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="File not found")
 
-        if user is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail="User not found")
+        return file
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise e
+
+
+async def share_file_with_user_db(file_id: int, user_id: int, db: AsyncSession, slim: bool = False):
+    try:
+        await _get_existing_file_id(file_id, db)
+        await _get_existing_user_id(user_id, db)
+
+        result = await db.execute(insert_ignore(file_user, db)
+                                  .values(file_id=file_id, user_id=user_id)
+                                  .returning(file_user.c.user_id))
 
-        if user in file.users:
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="File is already shared with this user")
 
-        file.users.append(user)
-        db.commit()
-        db.refresh(file)
+        await count_new_direct_users(file_id, [user_id], db)
+        await db.commit()
+        share_sketches.add_file_users(file_id, [user_id])
+        access_index.share_file_with_users(file_id, [user_id])
+        file_cache.invalidate(file_id)
 
-        return file
+        if slim:
+            return ShareAcknowledgement(id=file_id, shared_with_id=user_id)
+
+        return await get_file_by_id_db(file_id, db)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-async def share_file_with_group_db(file_id: int, group_id: int, db: Session):
+async def share_file_with_group_db(file_id: int, group_id: int, db: AsyncSession, slim: bool = False):
     try:
-        file = db.query(File).filter(File.id == file_id).first()
-        group = db.query(Group).filter(Group.id == group_id).first()
-
-        if file is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail="File not found")
+        await _get_existing_file_id(file_id, db)
+        result = await db.execute(select(Group.id).filter(Group.id == group_id))
 
-        if group is None:
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="Group not found")
 
-        if group in file.groups:
+        result = await db.execute(insert_ignore(file_group, db)
+                                  .values(file_id=file_id, group_id=group_id)
+                                  .returning(file_group.c.group_id))
+
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="File is already shared with this group")
 
-        file.groups.append(group)
-        db.commit()
-        db.refresh(file)
+        await count_new_group_shares(file_id, [group_id], db)
+        await db.commit()
+        share_sketches.add_file_groups(file_id, [group_id])
+        access_index.share_file_with_groups(file_id, [group_id])
+        file_cache.invalidate(file_id)
 
-        return file
+        if slim:
+            return ShareAcknowledgement(id=file_id, shared_with_id=group_id)
+
+        return await get_file_by_id_db(file_id, db)
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def _get_existing_file_id(file_id: int, db: AsyncSession) -> int:
+    result = await db.execute(select(File.id).filter(File.id == file_id))
+
+    if result.scalar() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="File not found")
+
+    return file_id
+
+
+async def _get_existing_user_id(user_id: int, db: AsyncSession) -> int:
+    result = await db.execute(select(User.id).filter(User.id == user_id))
+
+    if result.scalar() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
+
+    return user_id
+
+
+async def share_file_with_users_db(file_id: int, user_ids: List[int], db: AsyncSession) -> ShareBatchResponse:
+    try:
+        await _get_existing_file_id(file_id, db)
+        user_ids = list(dict.fromkeys(user_ids))
+
+        result = await db.execute(select(User.id).filter(User.id.in_(user_ids)))
+        found_ids = set(result.scalars())
+
+        added_ids = set()
+        if found_ids:
+            result = await db.execute(insert_ignore(file_user, db)
+                                      .values([{"file_id": file_id, "user_id": user_id} for user_id in found_ids])
+                                      .returning(file_user.c.user_id))
+            added_ids = set(result.scalars())
+
+        await count_new_direct_users(file_id, added_ids, db)
+        await db.commit()
+        share_sketches.add_file_users(file_id, added_ids)
+        access_index.share_file_with_users(file_id, added_ids)
+        if added_ids:
+            file_cache.invalidate(file_id)
+
+        return build_share_results(user_ids, found_ids, added_ids)
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def share_file_with_groups_db(file_id: int, group_ids: List[int], db: AsyncSession) -> ShareBatchResponse:
+    try:
+        await _get_existing_file_id(file_id, db)
+        group_ids = list(dict.fromkeys(group_ids))
+
+        result = await db.execute(select(Group.id).filter(Group.id.in_(group_ids)))
+        found_ids = set(result.scalars())
+
+        added_ids = set()
+        if found_ids:
+            result = await db.execute(insert_ignore(file_group, db)
+                                      .values([{"file_id": file_id, "group_id": group_id} for group_id in found_ids])
+                                      .returning(file_group.c.group_id))
+            added_ids = set(result.scalars())
+
+        await count_new_group_shares(file_id, added_ids, db)
+        await db.commit()
+        share_sketches.add_file_groups(file_id, added_ids)
+        access_index.share_file_with_groups(file_id, added_ids)
+        if added_ids:
+            file_cache.invalidate(file_id)
+
+        return build_share_results(group_ids, found_ids, added_ids)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-async def get_top_shared_file_db(k: int, db) -> List[FileTopSharedResponse]:
+async def get_top_shared_file_db(k: int, db: AsyncSession) -> List[FileTopSharedResponse]:
     try:
-        top_shared_files_sql_query = text(f"""
-        SELECT file_name,risk,
-        COALESCE(string_agg(DISTINCT users, ',' )) AS merged_users,    
-        COUNT(DISTINCT users) AS merged_users_count
-        FROM
-            (
-            SELECT file_id,file_name,risk,users
-            FROM (
-                SELECT f.id AS file_id, f.name AS file_name,f.risk, u.name AS users
-                FROM 
-                    "file" AS f
-                LEFT JOIN 
-                    file_user AS fu ON f.id = fu.file_id
-                LEFT JOIN 
-                    "user" AS u ON fu.user_id = u.id
-
-                UNION
-
-                SELECT f.id AS file_id, f.name AS file_name,f.risk,ug_user.name AS users
-                FROM 
-                    "file" AS f
-                LEFT JOIN 
-                    file_group AS fg ON f.id = fg.file_id
-                LEFT JOIN 
-                    user_group AS ug ON fg.group_id = ug.group_id
-                LEFT JOIN 
-                    "user" AS ug_user ON ug.user_id = ug_user.id
-            ) AS subquery)
-        group by file_id, file_name,risk
-        ORDER BY merged_users_count DESC
-        LIMIT {k}
-        """)
-
-        result = db.execute(top_shared_files_sql_query)
+        result = await db.execute(select(File.id, File.name, File.risk)
+                                  .order_by(File.shared_users_count.desc(), File.id)
+                                  .limit(k))
+        top_files = result.all()
+        file_ids = [file_id for file_id, _, _ in top_files]
+
+        direct_users = (select(file_user.c.file_id, User.name)
+                        .join(User, User.id == file_user.c.user_id)
+                        .where(file_user.c.file_id.in_(file_ids)))
+        group_users = (select(file_group.c.file_id, User.name)
+                       .select_from(file_group)
+                       .join(user_group, user_group.c.group_id == file_group.c.group_id)
+                       .join(User, User.id == user_group.c.user_id)
+                       .where(file_group.c.file_id.in_(file_ids)))
+
+        merged_users: Dict[int, List[str]] = {file_id: [] for file_id in file_ids}
+        for file_id, user_name in await db.execute(union(direct_users, group_users)):
+            merged_users[file_id].append(user_name)
+
         files = []
-        for row in result:
-            file_name, risk, merged_users, merged_users_count = row
-            users: list[UserShared] = merged_users.split(',') if merged_users else []
+        for file_id, file_name, risk in top_files:
             file_data = {
                 "name": file_name,
                 "risk": risk,
-                "users": users
+                "users": sorted(merged_users[file_id])
             }
             files.append(FileTopSharedResponse(**file_data))
         return files
 
     except Exception as e:
         raise e
+
+
+async def get_top_exposed_files_db(k: int, db: AsyncSession, min_risk: Optional[int] = None,
+                                   after_exposure: Optional[int] = None,
+                                   after_id: Optional[int] = None) -> List[FileExposureResponse]:
+    """
+    Rank exposed files by exposure (risk times shared_users_count), highest first, ties by ID descending.
+
+    The page walks the (exposure, id) index backwards from the cursor, so it
+    reads about k rows however deep the page is. Files nobody can see, or
+    with no risk, have no exposure and are left out.
+    """
+    try:
+        query = (select(File.id, File.name, File.risk, File.shared_users_count, File.exposure)
+                 .filter(File.exposure > 0)
+                 .order_by(File.exposure.desc(), File.id.desc())
+                 .limit(k))
+
+        if min_risk is not None:
+            query = query.filter(File.risk >= min_risk)
+
+        if after_id is not None:
+            query = query.filter(tuple_(File.exposure, File.id) < tuple_(after_exposure, after_id))
+
+        result = await db.execute(query)
+        return [FileExposureResponse(**row._mapping) for row in result]
+
+    except Exception as e:
+        raise e
+
+
+async def get_top_shared_file_approximate_db(k: int, db: AsyncSession) -> FileTopSharedApproximateResponse:
+    try:
+        if not share_sketches.ready:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Share sketches are not loaded")
+
+        top_files = share_sketches.top(k)
+
+        result = await db.execute(select(File.id, File.name, File.risk)
+                                  .filter(File.id.in_([file_id for file_id, _, _ in top_files])))
+        file_details = {file_id: (file_name, risk) for file_id, file_name, risk in result}
+
+        files = []
+        for file_id, estimated_users_count, error_bound in top_files:
+            if file_id not in file_details:
+                # Shared through another worker, or not on the replica yet.
+                continue
+
+            file_name, risk = file_details[file_id]
+            files.append(FileTopSharedEstimate(name=file_name, risk=risk,
+                                               estimated_users_count=estimated_users_count,
+                                               error_bound=error_bound))
+
+        return FileTopSharedApproximateResponse(relative_error=share_sketches.relative_error, files=files)
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise e
+
+
+async def get_risk_histogram_db(bucket_size: int, db: AsyncSession) -> FileRiskHistogramResponse:
+    try:
+        # At most 101 rows, one per risk value, maintained as files are created.
+        result = await db.execute(select(file_risk_count.c.risk, file_risk_count.c.files))
+
+        counts = [0] * (MAX_RISK // bucket_size + 1)
+        for risk, files in result:
+            counts[min(max(risk, 0), MAX_RISK) // bucket_size] += files
+
+        buckets = [FileRiskBucket(min_risk=index * bucket_size,
+                                  max_risk=min((index + 1) * bucket_size - 1, MAX_RISK),
+                                  files=files)
+                   for index, files in enumerate(counts)]
+
+        return FileRiskHistogramResponse(bucket_size=bucket_size, total=sum(counts), buckets=buckets)
+
+    except Exception as e:
+        raise e
@@ -1,28 +1,96 @@
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload, selectinload
 from fastapi import HTTPException, status
 
+from app.config.config import BULK_INSERT_CHUNK_SIZE
+from app.database.dialect import insert_ignore
+from app.database.operations.access_index import access_index
+from app.database.operations.share_counts import count_new_group_members
+from app.database.operations.share_sketches import share_sketches
 from app.models.group import Group
 from app.models.user import User
-from app.schemas.group import GroupCreate
+from app.models.user_group import user_group
+from app.schemas.group import GroupCreate, GroupResponse
+from app.schemas.share import ShareAcknowledgement, ShareBatchResponse, build_share_results
+from app.utils.entity_cache import group_cache
+
+
+# GroupResponse embeds its users, which are batch loaded with a single IN
+# query; any other relationship access raises instead of lazy loading.
+GROUP_RESPONSE_LOAD_OPTIONS = (
+    selectinload(Group.users).load_only(User.id, User.name),
+    raiseload("*"),
+)
 
+# The fast path looks up the members of this many groups per IN query, the
+# same batch size selectinload uses.
+ROWS_IN_CHUNK_SIZE = 500
 
-async def create_group_db(group: GroupCreate, db: Session):
+GROUP_RESPONSE_FIELDS = tuple(GroupResponse.model_fields)
+GROUP_RELATIONSHIPS = ("users",)
+
+
+async def create_group_db(group: GroupCreate, db: AsyncSession):
     try:
-        db_group = Group(**group.dict())
+        db_group = Group(**group.dict(), users=[])
         db.add(db_group)
-        db.commit()
-        db.refresh(db_group)
+        await db.commit()
 
         return db_group
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-async def get_all_groups_db(db: Session):
+async def bulk_create_groups_db(records: AsyncIterator[GroupCreate], db: AsyncSession) -> List[int]:
+    try:
+        group_ids = []
+        chunk = []
+
+        async for record in records:
+            chunk.append(record.model_dump())
+
+            if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                group_ids.extend(await _insert_groups(chunk, db))
+                chunk = []
+
+        if chunk:
+            group_ids.extend(await _insert_groups(chunk, db))
+
+        await db.commit()
+
+        return group_ids
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def _insert_groups(chunk: List[dict], db: AsyncSession) -> List[int]:
+    result = await db.execute(insert(Group).returning(Group.id, sort_by_parameter_order=True), chunk)
+    return list(result.scalars())
+
+
+def _groups_page_query(after_id: Optional[int], limit: Optional[int]):
+    query = select(Group).order_by(Group.id).options(*GROUP_RESPONSE_LOAD_OPTIONS)
+
+    if after_id is not None:
+        query = query.filter(Group.id > after_id)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+async def get_all_groups_db(db: AsyncSession, after_id: Optional[int] = None, limit: Optional[int] = None):
     try:
-        groups = db.query(Group).all()
+        result = await db.execute(_groups_page_query(after_id, limit))
+        groups = result.scalars().all()
 
         return groups
 
@@ -30,9 +98,108 @@ async def get_all_groups_db(db: Session):
         raise e
 
 
-async def get_group_by_id_db(group_id: int, db: Session):
+async def stream_groups_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> AsyncIterator[Group]:
+    query = _groups_page_query(after_id, limit).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+
+    async for chunk in result.scalars().partitions():
+        for group in chunk:
+            yield group
+
+
+def _group_rows_page_query(after_id: Optional[int], limit: Optional[int]):
+    query = select(Group.id, Group.name).order_by(Group.id)
+
+    if after_id is not None:
+        query = query.filter(Group.id > after_id)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+async def _group_rows(rows: Sequence, db: AsyncSession,
+                      fields: Sequence[str] = GROUP_RESPONSE_FIELDS) -> List[dict]:
+    """
+    Turn (id, name) rows into plain dicts holding `fields`, in GroupResponse field order.
+
+    The members of each chunk of groups are read with one join on the
+    association table, without loading any ORM objects, and only when
+    `users` is among `fields`.
+    """
+    groups = []
+    for start in range(0, len(rows), ROWS_IN_CHUNK_SIZE):
+        chunk = rows[start:start + ROWS_IN_CHUNK_SIZE]
+        members: Dict[int, List[dict]] = {}
+
+        if "users" in fields:
+            result = await db.execute(select(user_group.c.group_id, User.name, User.id)
+                                      .join(User, User.id == user_group.c.user_id)
+                                      .where(user_group.c.group_id.in_([row.id for row in chunk]))
+                                      .order_by(user_group.c.group_id, User.id))
+
+            for group_id, name, user_id in result:
+                members.setdefault(group_id, []).append({"name": name, "id": user_id})
+
+        for row in chunk:
+            values = {"name": row.name, "users": members.get(row.id, [])}
+            groups.append({field: values[field] for field in fields})
+    return groups
+
+
+async def get_group_rows_db(db: AsyncSession, after_id: Optional[int] = None, limit: Optional[int] = None,
+                            fields: Sequence[str] = GROUP_RESPONSE_FIELDS) -> Tuple[List[dict], Optional[int]]:
+    """
+    Fetch a page of groups as plain dicts, for encoding without Pydantic.
+
+    Returns:
+        Tuple[List[dict], Optional[int]]: The groups, and the ID of the last one.
+    """
     try:
-        group = db.query(Group).filter(Group.id == group_id).first()
+        rows = (await db.execute(_group_rows_page_query(after_id, limit))).all()
+
+        return await _group_rows(rows, db, fields), rows[-1].id if rows else None
+
+    except Exception as e:
+        raise e
+
+
+async def stream_group_rows_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                               limit: Optional[int] = None,
+                               fields: Sequence[str] = GROUP_RESPONSE_FIELDS) -> AsyncIterator[dict]:
+    query = _group_rows_page_query(after_id, limit).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+
+    async for chunk in result.partitions():
+        for group in await _group_rows(chunk, db, fields):
+            yield group
+
+
+async def get_group_row_db(group_id: int, db: AsyncSession, fields: Sequence[str]) -> dict:
+    try:
+        result = await db.execute(select(Group.id, Group.name).filter(Group.id == group_id))
+        row = result.first()
+
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Group not found")
+
+        return (await _group_rows([row], db, fields))[0]
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise e
+
+
+async def get_group_by_id_db(group_id: int, db: AsyncSession):
+    try:
+        result = await db.execute(select(Group).filter(Group.id == group_id)
+                                  .options(*GROUP_RESPONSE_LOAD_OPTIONS))
+        group = result.scalars().first()
 
         if group is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -46,32 +213,79 @@ async def get_group_by_id_db(group_id: int, db: Session):
         raise e
 
 
-async def share_group_with_user_db(group_id: int, user_id: int, db: Session):
+async def share_group_with_user_db(group_id: int, user_id: int, db: AsyncSession, slim: bool = False):
     try:
-        group = db.query(Group).filter(Group.id == group_id).first()
-        user = db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(select(Group.id).filter(Group.id == group_id))
 
-        if group is None:
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="Group not found")
 
-        if user is None:
+        result = await db.execute(select(User.id).filter(User.id == user_id))
+
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                                 detail="User not found")
 
-        if user in group.users:
+        result = await db.execute(insert_ignore(user_group, db)
+                                  .values(group_id=group_id, user_id=user_id)
+                                  .returning(user_group.c.user_id))
+
+        if result.scalar() is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                                 detail="Group is already shared with this user")
 
-        group.users.append(user)
-        db.commit()
-        db.refresh(group)
+        await count_new_group_members(group_id, [user_id], db)
+        await db.commit()
+        share_sketches.add_group_users(group_id, [user_id])
+        access_index.share_group_with_users(group_id, [user_id])
+        group_cache.invalidate(group_id)
 
-        return group
+        if slim:
+            return ShareAcknowledgement(id=group_id, shared_with_id=user_id)
+
+        return await get_group_by_id_db(group_id, db)
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def share_group_with_users_db(group_id: int, user_ids: List[int], db: AsyncSession) -> ShareBatchResponse:
+    try:
+        result = await db.execute(select(Group.id).filter(Group.id == group_id))
+
+        if result.scalar() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Group not found")
+
+        user_ids = list(dict.fromkeys(user_ids))
+
+        result = await db.execute(select(User.id).filter(User.id.in_(user_ids)))
+        found_ids = set(result.scalars())
+
+        added_ids = set()
+        if found_ids:
+            result = await db.execute(insert_ignore(user_group, db)
+                                      .values([{"user_id": user_id, "group_id": group_id} for user_id in found_ids])
+                                      .returning(user_group.c.user_id))
+            added_ids = set(result.scalars())
+
+        await count_new_group_members(group_id, added_ids, db)
+        await db.commit()
+        share_sketches.add_group_users(group_id, added_ids)
+        access_index.share_group_with_users(group_id, added_ids)
+        if added_ids:
+            group_cache.invalidate(group_id)
+
+        return build_share_results(user_ids, found_ids, added_ids)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
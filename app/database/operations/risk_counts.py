@@ -0,0 +1,35 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.dialect import dialect_insert
+from app.models.file import File
+from app.models.file_risk_count import file_risk_count
+
+# file_risk_count holds the number of files with each risk value. count_new_files
+# is called right after files are inserted, in the same transaction, so the
+# counts commit or roll back together with the files. rebuild_risk_counts_db
+# recomputes them from the file table.
+
+
+async def count_new_files(risks: Iterable[Optional[int]], db: AsyncSession):
+    """Account for files just inserted with the given risks."""
+    counts = Counter(risk for risk in risks if risk is not None)
+    if not counts:
+        return
+
+    # Rows are upserted in risk order so that concurrent inserts lock them in the same order.
+    query = dialect_insert(file_risk_count, db).values([{"risk": risk, "files": files}
+                                                        for risk, files in sorted(counts.items())])
+    await db.execute(query.on_conflict_do_update(index_elements=[file_risk_count.c.risk],
+                                                 set_={"files": file_risk_count.c.files + query.excluded.files}))
+
+
+async def rebuild_risk_counts_db(db: AsyncSession):
+    """Recompute every risk count from the file table."""
+    await db.execute(delete(file_risk_count))
+    await db.execute(insert(file_risk_count).from_select(
+        ["risk", "files"],
+        select(File.risk, func.count()).where(File.risk.is_not(None)).group_by(File.risk)))
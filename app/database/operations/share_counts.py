@@ -0,0 +1,136 @@
+from typing import Iterable
+
+from sqlalchemy import func, select, text, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.file import File
+from app.models.file_group import file_group
+from app.models.file_user import file_user
+from app.models.user import User
+from app.models.user_group import user_group
+
+# File.shared_users_count holds the number of distinct users that can see a
+# file, either shared directly (file_user) or through a group (file_group ->
+# user_group). The helpers below are called right after new junction rows are
+# inserted, in the same transaction, and add only the users that were not
+# already reachable. Concurrent shares that reach the same user through
+# different paths can still over count; rebuild_share_counts_db corrects it.
+#
+# File.exposure is risk * shared_users_count. It is refreshed by the same
+# helpers, right after the count changes, so the two never drift apart.
+
+file_table = File.__table__
+user_table = User.__table__
+
+
+def _shared_directly(file_id, user_id):
+    return (select(file_user.c.file_id)
+            .where(file_user.c.file_id == file_id, file_user.c.user_id == user_id)
+            .correlate_except(file_user)
+            .exists())
+
+
+def _reached_through_groups(file_id, user_id, excluded_group_ids: Iterable[int] = ()):
+    fg = file_group.alias()
+    ug = user_group.alias()
+    query = (select(fg.c.file_id)
+             .select_from(fg.join(ug, ug.c.group_id == fg.c.group_id))
+             .where(fg.c.file_id == file_id, ug.c.user_id == user_id)
+             .correlate_except(fg, ug))
+
+    excluded_group_ids = list(excluded_group_ids)
+    if excluded_group_ids:
+        query = query.where(fg.c.group_id.not_in(excluded_group_ids))
+
+    return query.exists()
+
+
+async def _refresh_exposure(files, db: AsyncSession):
+    # A separate statement, so the new audience subquery is not evaluated twice.
+    await db.execute(update(file_table)
+                     .where(files)
+                     .values(exposure=file_table.c.risk * file_table.c.shared_users_count))
+
+
+async def count_new_direct_users(file_id: int, user_ids: Iterable[int], db: AsyncSession):
+    """Account for users just inserted into file_user for a file."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    new_audience = (select(func.count())
+                    .select_from(user_table)
+                    .where(user_table.c.id.in_(user_ids),
+                           ~_reached_through_groups(file_id, user_table.c.id))
+                    .correlate_except(user_table)
+                    .scalar_subquery())
+
+    await db.execute(update(file_table)
+                     .where(file_table.c.id == file_id)
+                     .values(shared_users_count=file_table.c.shared_users_count + new_audience))
+    await _refresh_exposure(file_table.c.id == file_id, db)
+
+
+async def count_new_group_shares(file_id: int, group_ids: Iterable[int], db: AsyncSession):
+    """Account for groups just inserted into file_group for a file."""
+    group_ids = list(group_ids)
+    if not group_ids:
+        return
+
+    new_audience = (select(func.count(user_group.c.user_id.distinct()))
+                    .where(user_group.c.group_id.in_(group_ids),
+                           ~_shared_directly(file_id, user_group.c.user_id),
+                           ~_reached_through_groups(file_id, user_group.c.user_id, group_ids))
+                    .correlate_except(user_group)
+                    .scalar_subquery())
+
+    await db.execute(update(file_table)
+                     .where(file_table.c.id == file_id)
+                     .values(shared_users_count=file_table.c.shared_users_count + new_audience))
+    await _refresh_exposure(file_table.c.id == file_id, db)
+
+
+async def count_new_group_members(group_id: int, user_ids: Iterable[int], db: AsyncSession):
+    """Account for users just inserted into user_group, for every file shared with the group."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+
+    new_audience = (select(func.count())
+                    .select_from(user_table)
+                    .where(user_table.c.id.in_(user_ids),
+                           ~_shared_directly(file_table.c.id, user_table.c.id),
+                           ~_reached_through_groups(file_table.c.id, user_table.c.id, [group_id]))
+                    .correlate_except(user_table)
+                    .scalar_subquery())
+
+    group_files = select(file_group.c.file_id).where(file_group.c.group_id == group_id)
+
+    await db.execute(update(file_table)
+                     .where(file_table.c.id.in_(group_files))
+                     .values(shared_users_count=file_table.c.shared_users_count + new_audience))
+    await _refresh_exposure(file_table.c.id.in_(group_files), db)
+
+
+async def rebuild_share_counts_db(db: AsyncSession):
+    """Recompute shared_users_count, and with it exposure, for every file from the junction tables."""
+    rebuild_sql_query = text("""
+    UPDATE "file" SET shared_users_count = (
+        SELECT COUNT(*)
+        FROM (
+            SELECT fu.user_id
+            FROM file_user AS fu
+            WHERE fu.file_id = "file".id
+
+            UNION
+
+            SELECT ug.user_id
+            FROM file_group AS fg
+            JOIN user_group AS ug ON ug.group_id = fg.group_id
+            WHERE fg.file_id = "file".id
+        ) AS audience
+    )
+    """)
+
+    await db.execute(rebuild_sql_query)
+    await _refresh_exposure(true(), db)
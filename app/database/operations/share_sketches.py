@@ -0,0 +1,35 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import SHARE_SKETCH_CAPACITY, SHARE_SKETCH_PRECISION, STREAM_CHUNK_SIZE
+from app.models.file_group import file_group
+from app.models.file_user import file_user
+from app.models.user_group import user_group
+from app.utils.sketches import ShareSketches
+
+# Process-wide sketches behind the approximate TopSharedFiles mode. The share
+# operations update them after each commit; shares committed by other worker
+# processes are picked up by the next load_share_sketches_db.
+share_sketches = ShareSketches(SHARE_SKETCH_PRECISION, SHARE_SKETCH_CAPACITY)
+
+
+async def load_share_sketches_db(db: AsyncSession):
+    sketches = ShareSketches(SHARE_SKETCH_PRECISION, SHARE_SKETCH_CAPACITY)
+
+    # Group memberships first, so each file_group row merges a complete group sketch.
+    rows = await db.stream(select(user_group.c.group_id, user_group.c.user_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for group_id, user_id in rows:
+        sketches.add_group_users(group_id, [user_id])
+
+    rows = await db.stream(select(file_group.c.file_id, file_group.c.group_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for file_id, group_id in rows:
+        sketches.add_file_groups(file_id, [group_id])
+
+    rows = await db.stream(select(file_user.c.file_id, file_user.c.user_id)
+                           .execution_options(yield_per=STREAM_CHUNK_SIZE))
+    async for file_id, user_id in rows:
+        sketches.add_file_users(file_id, [user_id])
+
+    share_sketches.replace(sketches)
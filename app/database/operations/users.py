@@ -1,27 +1,76 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, union
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config.config import BULK_INSERT_CHUNK_SIZE
+from app.models.file import File
+from app.models.file_group import file_group
+from app.models.file_user import file_user
 from app.models.user import User
+from app.models.user_group import user_group
 from app.schemas.user import UserCreate
 
 
-async def create_user_db(user: UserCreate, db: Session):
+async def create_user_db(user: UserCreate, db: AsyncSession):
     try:
         db_user = User(**user.dict())
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
 
         return db_user
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise e
 
 
-async def get_all_users_db(db: Session):
+async def bulk_create_users_db(records: AsyncIterator[UserCreate], db: AsyncSession) -> List[int]:
+    try:
+        user_ids = []
+        chunk = []
+
+        async for record in records:
+            chunk.append(record.model_dump())
+
+            if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                user_ids.extend(await _insert_users(chunk, db))
+                chunk = []
+
+        if chunk:
+            user_ids.extend(await _insert_users(chunk, db))
+
+        await db.commit()
+
+        return user_ids
+
+    except Exception as e:
+        await db.rollback()
+        raise e
+
+
+async def _insert_users(chunk: List[dict], db: AsyncSession) -> List[int]:
+    result = await db.execute(insert(User).returning(User.id, sort_by_parameter_order=True), chunk)
+    return list(result.scalars())
+
+
+def _users_page_query(after_id: Optional[int], limit: Optional[int]):
+    query = select(User).order_by(User.id)
+
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query
+
+
+async def get_all_users_db(db: AsyncSession, after_id: Optional[int] = None, limit: Optional[int] = None):
     try:
-        users = db.query(User).all()
+        result = await db.execute(_users_page_query(after_id, limit))
+        users = result.scalars().all()
 
         return users
 
@@ -29,9 +78,49 @@ async def get_all_users_db(db: Session):
         raise e
 
 
-async def get_user_by_id_db(user_id: int, db: Session):
+async def stream_users_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                          limit: Optional[int] = None) -> AsyncIterator[User]:
+    query = _users_page_query(after_id, limit).execution_options(yield_per=chunk_size)
+    result = await db.stream(query)
+
+    async for chunk in result.scalars().partitions():
+        for user in chunk:
+            yield user
+
+
+async def get_user_rows_db(db: AsyncSession, after_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Fetch a page of users as plain dicts in UserResponse field order, for encoding without Pydantic.
+
+    Returns:
+        Tuple[List[dict], Optional[int]]: The users, and the ID of the last one.
+    """
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        result = await db.execute(_users_page_query(after_id, limit).with_only_columns(User.name, User.id))
+        users = [{"name": name, "id": user_id} for name, user_id in result]
+
+        return users, users[-1]["id"] if users else None
+
+    except Exception as e:
+        raise e
+
+
+async def stream_user_rows_db(db: AsyncSession, chunk_size: int, after_id: Optional[int] = None,
+                              limit: Optional[int] = None) -> AsyncIterator[dict]:
+    query = (_users_page_query(after_id, limit).with_only_columns(User.name, User.id)
+             .execution_options(yield_per=chunk_size))
+    result = await db.stream(query)
+
+    async for chunk in result.partitions():
+        for name, user_id in chunk:
+            yield {"name": name, "id": user_id}
+
+
+async def get_user_by_id_db(user_id: int, db: AsyncSession):
+    try:
+        result = await db.execute(select(User).filter(User.id == user_id))
+        user = result.scalars().first()
 
         if user is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -43,3 +132,42 @@ async def get_user_by_id_db(user_id: int, db: Session):
 
     except Exception as e:
         raise e
+
+
+async def get_accessible_files_db(user_id: int, db: AsyncSession, after_id: Optional[int] = None,
+                                  min_risk: Optional[int] = None, limit: int = 100):
+    try:
+        result = await db.execute(select(User.id).filter(User.id == user_id))
+
+        if result.scalar() is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="User not found")
+
+        # Both branches start from the user: file_user(user_id) for direct
+        # shares, user_group(user_id) -> file_group(group_id) for group shares.
+        direct_files = select(file_user.c.file_id).filter(file_user.c.user_id == user_id)
+        group_files = (select(file_group.c.file_id)
+                       .join(user_group, user_group.c.group_id == file_group.c.group_id)
+                       .filter(user_group.c.user_id == user_id))
+
+        query = (select(File.id, File.name, File.risk)
+                 .filter(File.id.in_(union(direct_files, group_files)))
+                 .order_by(File.id)
+                 .limit(limit))
+
+        if after_id is not None:
+            query = query.filter(File.id > after_id)
+
+        if min_risk is not None:
+            query = query.filter(File.risk >= min_risk)
+
+        result = await db.execute(query)
+        files = result.all()
+
+        return files
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        raise e
@@ -0,0 +1,40 @@
+"""
+Recompute the derived per-file aggregates from the source tables.
+
+The schema is brought up to date first, so a database created by an earlier
+version can be rebuilt before the application has started on it.
+
+Usage:
+    python -m app.database.rebuild
+"""
+import asyncio
+import logging
+
+from app.database.database import SessionLocal, create_database, engine
+from app.database.operations.risk_counts import rebuild_risk_counts_db
+from app.database.operations.share_counts import rebuild_share_counts_db
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild():
+    await create_database()
+
+    async with SessionLocal() as db:
+        try:
+            await rebuild_share_counts_db(db)
+            await rebuild_risk_counts_db(db)
+            await db.commit()
+            logger.info("Share and risk counts rebuilt.")
+
+        except Exception as e:
+            await db.rollback()
+            logger.error("Error occurred while rebuilding share and risk counts - %s", e)
+            raise e
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild())
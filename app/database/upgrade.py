@@ -0,0 +1,80 @@
+"""
+Bring a database created by an earlier version up to the current schema.
+
+There is no migration tool: create_all only creates the tables that are
+missing, so the columns and indexes added to existing tables since are added
+here, and the derived values the new columns hold are backfilled. Every step
+checks the live schema first, so running it again changes nothing.
+create_database runs it on every startup and before a rebuild.
+"""
+import logging
+from typing import Dict, Set
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.schema import CreateIndex
+
+from app import models  # noqa: F401 - registers the tables for create_all
+from app.database.database import Base
+from app.database.operations.risk_counts import rebuild_risk_counts_db
+from app.database.operations.share_counts import rebuild_share_counts_db
+
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that earlier versions created, with their DDL.
+# Existing rows get the server default until they are backfilled.
+ADDED_COLUMNS = {
+    "file": {
+        "exposure": "INTEGER NOT NULL DEFAULT 0",
+        "shared_users_count": "INTEGER NOT NULL DEFAULT 0",
+    },
+}
+
+# Indexes added to tables that earlier versions created, as named in the models.
+ADDED_INDEXES = ("ix_file_shared_users_count", "ix_file_risk_id", "ix_file_exposure_id",
+                 # Reverse lookups from a user or group to its shares and members.
+                 "ix_file_user_user_id", "ix_file_group_group_id", "ix_user_group_group_id")
+
+
+def _existing_columns(connection) -> Dict[str, Set[str]]:
+    inspector = inspect(connection)
+    return {table: {column["name"] for column in inspector.get_columns(table)}
+            for table in inspector.get_table_names()}
+
+
+async def upgrade_schema(connection: AsyncConnection):
+    """
+    Create the missing tables, add the missing columns and indexes, and backfill the added columns.
+
+    Args:
+        connection (AsyncConnection): The connection to run on; everything happens in its transaction.
+    """
+    existing = await connection.run_sync(_existing_columns)
+    await connection.run_sync(Base.metadata.create_all)
+
+    added = set()
+    for table, columns in ADDED_COLUMNS.items():
+        for column, ddl in columns.items():
+            if table in existing and column not in existing[table]:
+                await connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {ddl}'))
+                added.add(column)
+                logger.info("Added column %s.%s.", table, column)
+
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    for name in ADDED_INDEXES:
+        await connection.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+    # The risk histogram is a table of its own, new next to existing files.
+    if "file" in existing and "file_risk_count" not in existing:
+        added.add("file_risk_count")
+
+    if added:
+        async with AsyncSession(bind=connection) as db:
+            # Exposure is derived from the share count, so both are recomputed together.
+            if added & {"shared_users_count", "exposure"}:
+                await rebuild_share_counts_db(db)
+                logger.info("Backfilled the share counts and exposure.")
+
+            if "file_risk_count" in added:
+                await rebuild_risk_counts_db(db)
+                logger.info("Backfilled the risk counts.")
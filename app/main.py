@@ -1,30 +1,119 @@
+import asyncio
 import logging
 import os
+import re
 import uvicorn
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
-from app.database.database import create_database
-from app.routes import files, groups, users
-from app.utils.logger import setup_logging
+from app.config.config import (ACCESS_INDEX_ENABLED, LOG_FILE, SHARE_SKETCHES_ENABLED, SHARE_SKETCH_REFRESH_SECONDS,
+                               DB_CONNECT_RETRIES, DB_CONNECT_BACKOFF_SECONDS, DB_CONNECT_BACKOFF_MAX_SECONDS,
+                               DB_SKIP_DDL, DB_POOL_SIZE, DB_POOL_WARMUP, DB_REPLICA_URL, WEB_HOST, FASTAPI_PORT)
+from app.database.database import (SessionLocal, create_database, engine, replica_engine, wait_for_database,
+                                   warm_pool)
+from app.database.operations.access_index import access_index, load_access_index_db
+from app.database.operations.share_sketches import load_share_sketches_db, share_sketches
+from app.routes import admin, files, groups, users
+from app.utils.log_reader import (LogFilter, batched, gzip_chunks, last_lines, log_files,
+                                  parse_range, read_range, tail as read_tail)
+from app.utils.logger import setup_logging, shutdown_logging
+from app.utils.metrics import MetricsMiddleware, request_metrics
+from app.utils.profiling import SQLProfilingMiddleware
+from app.utils.read_your_writes import ReadYourWritesMiddleware
+from app.utils.readiness import readiness
 
-app = FastAPI()
 
-setup_logging()
+async def load_share_sketches():
+    async with SessionLocal() as db:
+        await load_share_sketches_db(db)
 
-logging.info('Application started')
+    logging.info('Share sketches loaded')
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
 
-log_file = os.path.join(current_dir, '..', 'logs', 'app.log')
+async def load_access_index():
+    async with SessionLocal() as db:
+        await load_access_index_db(db)
 
-create_database()
+    logging.info('Access index loaded')
 
 
+async def refresh_share_sketches():
+    while True:
+        await asyncio.sleep(SHARE_SKETCH_REFRESH_SECONDS)
+
+        try:
+            await load_share_sketches()
+
+        except Exception as e:
+            logging.error('Error occurred while refreshing share sketches - %s', e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Bring the worker up before it accepts requests, and tear it down after the last one.
+
+    The database is retried with backoff so the app can start before Postgres
+    does. Schema creation can be skipped when migrations are managed elsewhere.
+    If the database never comes up, startup fails and the server exits.
+    """
+    setup_logging()
+    refresh_task = None
+
+    await wait_for_database(DB_CONNECT_RETRIES, DB_CONNECT_BACKOFF_SECONDS, DB_CONNECT_BACKOFF_MAX_SECONDS)
+    readiness.database = True
+
+    if DB_SKIP_DDL:
+        readiness.schema = "skipped"
+    else:
+        await create_database()
+        readiness.schema = "created"
+
+    readiness.pool_target = min(DB_POOL_WARMUP, DB_POOL_SIZE)
+    readiness.pool_warmed = await warm_pool(readiness.pool_target)
+
+    if SHARE_SKETCHES_ENABLED:
+        await load_share_sketches()
+
+        if SHARE_SKETCH_REFRESH_SECONDS > 0:
+            refresh_task = asyncio.create_task(refresh_share_sketches())
+
+    if ACCESS_INDEX_ENABLED:
+        await load_access_index()
+
+    readiness.ready = True
+    logging.info('Application started')
+
+    yield
+
+    readiness.ready = False
+
+    if refresh_task is not None:
+        refresh_task.cancel()
+
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+    logging.info('Application stopped')
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+
+if DB_REPLICA_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(SQLProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(files.router)
 app.include_router(users.router)
 app.include_router(groups.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -32,13 +121,117 @@ async def health_check():
     return {"status": "UP"}
 
 
+@app.get("/ready")
+async def ready_check():
+    """
+    Report whether this worker can serve traffic.
+
+    Returns:
+        JSONResponse: The startup state (database reachable, schema, warmed pool
+        connections and in-memory indexes), with 200 once ready and 503 before.
+    """
+    state = {
+        **readiness.snapshot(),
+        "share_sketches": share_sketches.ready if SHARE_SKETCHES_ENABLED else None,
+        "access_index": access_index.ready if ACCESS_INDEX_ENABLED else None,
+    }
+    status_code = status.HTTP_200_OK if readiness.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(state, status_code=status_code)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/logs")
-async def get_logs():
-    if not os.path.exists(log_file):
+def get_logs(request: Request,
+             tail: Optional[int] = Query(None, ge=1, le=100000, description="Return only the last N lines"),
+             grep: Optional[str] = Query(None, description="Regular expression a record must match"),
+             level: Optional[str] = Query(None, description="Minimum level, e.g. WARNING"),
+             since: Optional[datetime] = Query(None, description="Only records logged at or after this time"),
+             until: Optional[datetime] = Query(None, description="Only records logged at or before this time")):
+    """
+    Read the application log.
+
+    Without parameters the current log file is returned and single byte ranges
+    are honoured. Filters are applied record by record across the rotated
+    backups as well, oldest first, and streamed rather than loaded.
+
+    Args:
+        request (Request): Used for the Range and Accept-Encoding headers.
+        tail (Optional[int]): Return only the last N (matching) lines.
+        grep (Optional[str]): Regular expression a record must match.
+        level (Optional[str]): Minimum level name.
+        since (Optional[datetime]): Start of the time window.
+        until (Optional[datetime]): End of the time window.
+
+    Returns:
+        Response: The selected log lines, gzip-compressed if the client accepts it.
+
+    Raises:
+        HTTPException: If the log file is not found (404), a filter is invalid (400)
+        or the byte range cannot be satisfied (416).
+    """
+    if not os.path.exists(LOG_FILE):
         raise HTTPException(status_code=404, detail="Log file not found")
 
-    return FileResponse(log_file)
+    log_filter = None
+    if grep is not None or level is not None or since is not None or until is not None:
+        try:
+            pattern = re.compile(grep.encode()) if grep is not None else None
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid grep pattern: {e}")
+
+        min_level = logging.getLevelName(level.upper()) if level is not None else None
+        if level is not None and not isinstance(min_level, int):
+            raise HTTPException(status_code=400, detail=f"Unknown log level: '{level}'")
+
+        log_filter = LogFilter(pattern, min_level, since, until)
+
+    if log_filter is None and tail is None:
+        size = os.path.getsize(LOG_FILE)
+        byte_range = None
+
+        if "range" in request.headers:
+            try:
+                byte_range = parse_range(request.headers["range"], size)
+            except ValueError:
+                raise HTTPException(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                                    detail="Requested range not satisfiable",
+                                    headers={"Content-Range": f"bytes */{size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            return StreamingResponse(read_range(LOG_FILE, start, end),
+                                     status_code=status.HTTP_206_PARTIAL_CONTENT,
+                                     media_type="text/plain",
+                                     headers={"Content-Range": f"bytes {start}-{end}/{size}",
+                                              "Content-Length": str(end - start + 1),
+                                              "Accept-Ranges": "bytes"})
+
+        if not _accepts_gzip(request):
+            return FileResponse(LOG_FILE, headers={"Accept-Ranges": "bytes"})
+
+        chunks = read_range(LOG_FILE, 0, size - 1)
+
+    elif log_filter is None:
+        chunks = iter([b"".join(read_tail(log_files(LOG_FILE), tail))])
+
+    else:
+        lines = log_filter.lines(log_files(LOG_FILE))
+        chunks = batched(iter(last_lines(lines, tail)) if tail is not None else lines)
+
+    if _accepts_gzip(request):
+        return StreamingResponse(gzip_chunks(chunks), media_type="text/plain",
+                                 headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return StreamingResponse(chunks, media_type="text/plain")
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
 
 
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="0.0.0.0", port=8001, reload=True)
+    # Development server with auto-reload; production runs `python -m app.server`.
+    uvicorn.run("app.main:app", host=WEB_HOST, port=FASTAPI_PORT, reload=True)
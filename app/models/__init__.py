@@ -4,3 +4,4 @@ from app.models.group import Group
 from app.models.file_group import file_group
 from app.models.file_user import file_user
 from app.models.user_group import user_group
+from app.models.file_risk_count import file_risk_count
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 from app.models.file_group import file_group
@@ -7,10 +7,16 @@ from app.models.file_user import file_user
 
 class File(Base):
     __tablename__ = "file"
+    # Serve risk range filters and (risk, id) keyset paging in either direction,
+    # and the exposure ranking with its (exposure, id) keyset paging.
+    __table_args__ = (Index("ix_file_risk_id", "risk", "id"),
+                      Index("ix_file_exposure_id", "exposure", "id"))
 
     id = Column(Integer, primary_key=True, index=True)
+    exposure = Column(Integer, nullable=False, default=0, server_default="0")
     name = Column(String)
     risk = Column(Integer)
+    shared_users_count = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
-    users = relationship('User', secondary=file_user, back_populates='files')
-    groups = relationship('Group', secondary=file_group, back_populates='files')
+    users = relationship('User', secondary=file_user, back_populates='files', order_by='User.id')
+    groups = relationship('Group', secondary=file_group, back_populates='files', order_by='Group.id')
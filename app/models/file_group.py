@@ -6,5 +6,5 @@ file_group = Table(
     'file_group',
     Base.metadata,
     Column('file_id', Integer, ForeignKey('file.id'), primary_key=True),
-    Column('group_id', Integer, ForeignKey('group.id'), primary_key=True)
+    Column('group_id', Integer, ForeignKey('group.id'), primary_key=True, index=True)
 )
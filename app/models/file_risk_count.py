@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Table
+
+from app.database.database import Base
+
+# Number of files per risk value (0-100), kept up to date as files are created
+# so that risk histograms never scan the file table.
+file_risk_count = Table(
+    'file_risk_count',
+    Base.metadata,
+    Column('risk', Integer, primary_key=True, autoincrement=False),
+    Column('files', Integer, nullable=False, default=0, server_default="0")
+)
@@ -12,5 +12,5 @@ class Group(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
 
-    users = relationship('User', secondary=user_group, back_populates='groups')
+    users = relationship('User', secondary=user_group, back_populates='groups', order_by='User.id')
     files = relationship('File', secondary=file_group, back_populates='groups')
@@ -0,0 +1,33 @@
+import logging
+
+from fastapi import APIRouter
+
+from app.database.database import get_pool_stats
+from app.utils.profiling import get_slow_queries
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/PoolStats", description="Get database connection pool statistics")
+async def pool_stats():
+    """
+    Report the database connection pool of this worker.
+
+    Returns:
+        dict: Checked-out, idle and overflow connections, the pool settings,
+        and how long sessions waited to check out a connection.
+    """
+    return get_pool_stats()
+
+
+@router.get("/SlowQueries", description="Get recent slow SQL queries")
+async def slow_queries():
+    """
+    List the most recent queries slower than SLOW_QUERY_THRESHOLD_MS, newest first.
+
+    Returns:
+        list: The statement, duration, route and time of each slow query, up to SLOW_QUERY_LOG_SIZE entries.
+    """
+    return get_slow_queries()
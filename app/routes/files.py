@@ -1,15 +1,34 @@
 import logging
+import time
 from pydantic import conint
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-
-from app.database.database import get_db
-from app.database.operations.files import (create_file_db, get_files_db,
-                                           get_file_by_id_db, share_file_with_user_db,
-                                           share_file_with_group_db, get_top_shared_file_db)
-from app.schemas.file import FileCreate, FileResponse, FileTopSharedResponse
+from typing import AsyncIterator, List, Optional, Sequence, Tuple, Union
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import STREAM_CHUNK_SIZE
+from app.database.database import get_db, get_read_db, is_replica, open_read_session, open_session
+from app.database.operations.access_index import check_access_index, confirm_access_db
+from app.database.operations.files import (FILE_RELATIONSHIPS, FILE_RESPONSE_FIELDS, FileFilter,
+                                           create_file_db, bulk_create_files_db,
+                                           get_files_db, stream_files_db,
+                                           get_file_rows_db, stream_file_rows_db,
+                                           get_file_by_id_db, get_file_row_db, share_file_with_user_db,
+                                           share_file_with_group_db, share_file_with_users_db,
+                                           share_file_with_groups_db, get_top_shared_file_db,
+                                           get_top_shared_file_approximate_db, get_top_exposed_files_db,
+                                           get_risk_histogram_db)
+from app.schemas.access import AccessCheckBatch, AccessCheckResponse
+from app.schemas.bulk import BulkCreateResponse
+from app.schemas.file import (FileCreate, FileExposureResponse, FileResponse, FileRiskHistogramResponse, FileSort,
+                              FileTopSharedApproximateResponse, FileTopSharedResponse)
+from app.schemas.share import FileShareWithGroups, FileShareWithUsers, ShareAcknowledgement, ShareBatchResponse
+from app.utils.bulk import BULK_CREATE_REQUEST_BODY, BulkRecordError, iter_bulk_records
+from app.utils.entity_cache import CachedEntity, file_cache
+from app.utils.fieldsets import parse_fieldset
+from app.utils.read_your_writes import reads_from_primary
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +37,13 @@ router = APIRouter(prefix="/files", tags=["files"])
 
 
 @router.post("/CreateFile/", response_model=FileResponse, description="Create file.")
-async def create_file(file: FileCreate, db: Session = Depends(get_db)):
+async def create_file(file: FileCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new file.
 
     Args:
         file (FileCreate): The details of the file to be created.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         FileResponse: The details of the created file.
@@ -35,167 +54,545 @@ async def create_file(file: FileCreate, db: Session = Depends(get_db)):
     try:
         file_created: FileResponse = await create_file_db(file, db)
 
-        logger.info(f"File: '{file.name}' - created.")
+        logger.info("File: '%s' - created.", file.name)
         return file_created
 
     except Exception as e:
-        logger.error(f"Error occurred during the creation of file- '{file.name}' - {e}")
+        logger.error("Error occurred during the creation of file- '%s' - %s", file.name, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while creating a file"
         )
 
 
+@router.post("/BulkCreateFiles/", response_model=BulkCreateResponse, description="Create files from an NDJSON or CSV body.",
+             openapi_extra=BULK_CREATE_REQUEST_BODY)
+async def bulk_create_files(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Create many files from an NDJSON or CSV request body.
+
+    Args:
+        request (Request): The request, whose body holds one FileCreate per line (CSV starts with a header row).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        BulkCreateResponse: The IDs of the created files, in input order.
+
+    Raises:
+        HTTPException: If any record is invalid (nothing is created), or if an error occurs.
+    """
+    try:
+        file_ids = await bulk_create_files_db(iter_bulk_records(request, FileCreate), db)
+
+        logger.info("%s files created in bulk.", len(file_ids))
+        return BulkCreateResponse(ids=file_ids)
+
+    except BulkRecordError as e:
+        logger.error("Invalid records in bulk files creation - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors
+        )
+
+    except Exception as e:
+        logger.error("Error occurred during bulk creation of files - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while creating files"
+        )
+
+
+async def _stream_files(request: Request, after_id: Optional[int], limit: Optional[int],
+                        fields: Optional[Sequence[str]], file_filter: FileFilter) -> AsyncIterator[Union[str, bytes]]:
+    try:
+        async with open_read_session(request) as db:
+            if fields is not None:
+                async for file in stream_file_rows_db(db, STREAM_CHUNK_SIZE, after_id, limit, fields, file_filter):
+                    yield orjson.dumps(file) + b"\n"
+            else:
+                async for file in stream_files_db(db, STREAM_CHUNK_SIZE, after_id, limit, file_filter):
+                    yield FileResponse.model_validate(file, from_attributes=True).model_dump_json() + "\n"
+
+    except Exception as e:
+        logger.error("Error occurred while streaming files: %s", e)
+        raise
+
+
+def _next_page_headers(last, file_filter: FileFilter) -> dict:
+    headers = {"X-Next-Cursor": str(last.id)}
+    if file_filter.sort != FileSort.id:
+        headers["X-Next-Risk"] = str(last.risk)
+    return headers
+
+
 @router.get("/GetAllFiles/", response_model=List[FileResponse], description="Get all files.")
-async def get_files(db: Session = Depends(get_db)):
+async def get_files(request: Request, response: Response, after_id: Optional[conint(ge=1)] = None,
+                    limit: Optional[conint(ge=1, le=1000)] = None, stream: bool = False,
+                    fast: bool = False, fields: Optional[str] = None, include: Optional[str] = None,
+                    min_risk: Optional[conint(ge=0, le=100)] = None, max_risk: Optional[conint(ge=0, le=100)] = None,
+                    sort: FileSort = FileSort.id, after_risk: Optional[conint(ge=0, le=100)] = None):
     """
-    Retrieve all files.
+    Retrieve all files, optionally one keyset page at a time.
 
     Args:
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, used to pick the replica or the primary.
+        after_id (int, optional): Return only files after this cursor.
+        limit (int, optional): The maximum number of files to return.
+        stream (bool, optional): Stream the files as NDJSON instead of a JSON list. Defaults to False.
+        fast (bool, optional): Select plain columns and encode them with orjson, skipping per-object
+            validation. The output is the same. Defaults to False.
+        fields (str, optional): Comma separated fields to return. Defaults to all of them.
+        include (str, optional): Comma separated relationships to return with the plain fields.
+        min_risk (int, optional): Return only files with at least this risk.
+        max_risk (int, optional): Return only files with at most this risk.
+        sort (FileSort, optional): Order by id, by risk ascending (risk) or descending (-risk),
+            ties broken by id. Defaults to id.
+        after_risk (int, optional): When sorting by risk, the risk of the file the after_id cursor points at.
 
     Returns:
-        List[FileResponse]: A list of all files.
+        List[FileResponse]: A list of all files. When the page is full, the
+        X-Next-Cursor header holds the after_id of the next page, and when
+        sorting by risk, the X-Next-Risk header holds its after_risk.
 
     Raises:
-        HTTPException: If an error occurs during the retrieval process.
+        HTTPException: If the cursor is incomplete or an error occurs during the retrieval process.
     """
     try:
-        files_retrieved: List[FileResponse] = await get_files_db(db)
+        if sort == FileSort.id and after_risk is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="after_risk is only used when sorting by risk")
 
-        logger.info(f"All Files retrieved.")
-        return files_retrieved
+        if sort != FileSort.id and (after_id is None) != (after_risk is None):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="after_id and after_risk must be given together when sorting by risk")
+
+        file_filter = FileFilter(min_risk, max_risk, sort, after_risk)
+        fieldset = parse_fieldset(FileResponse, FILE_RELATIONSHIPS, fields, include)
+        row_fields = fieldset or (FILE_RESPONSE_FIELDS if fast else None)
+
+        if stream:
+            logger.info("Streaming files after id: '%s'.", after_id)
+            return StreamingResponse(_stream_files(request, after_id, limit, row_fields, file_filter),
+                                     media_type="application/x-ndjson")
+
+        async with open_read_session(request) as db:
+            if row_fields is not None:
+                files_retrieved, last = await get_file_rows_db(db, after_id, limit, row_fields, file_filter)
+                headers = (_next_page_headers(last, file_filter)
+                           if limit is not None and len(files_retrieved) == limit else None)
+
+                logger.info("All Files retrieved.")
+                return ORJSONResponse(files_retrieved, headers=headers)
+
+            files_retrieved = await get_files_db(db, after_id, limit, file_filter)
+
+            if limit is not None and len(files_retrieved) == limit:
+                response.headers.update(_next_page_headers(files_retrieved[-1], file_filter))
+
+            logger.info("All Files retrieved.")
+            return files_retrieved
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving files: {e}")
+        logger.error("Error occurred while retrieving files: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving files"
         )
 
 
+@router.get("/RiskHistogram", response_model=FileRiskHistogramResponse, description="Get file counts per risk bucket.")
+async def get_risk_histogram(bucket_size: conint(ge=1, le=101) = 10, db: AsyncSession = Depends(get_read_db)):
+    """
+    Count the files in each risk bucket.
+
+    The counts come from file_risk_count, which holds one row per risk value
+    and is updated as files are created, so the file table is never scanned.
+
+    Args:
+        bucket_size (int, optional): The width of each bucket, in risk points. Default is 10.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        FileRiskHistogramResponse: Every bucket from risk 0 to 100 with its file count, and the total.
+
+    Raises:
+        HTTPException: If an error occurs during the retrieval process.
+    """
+    try:
+        histogram = await get_risk_histogram_db(bucket_size, db)
+
+        logger.info("Risk histogram with bucket size %s retrieved.", bucket_size)
+        return histogram
+
+    except Exception as e:
+        logger.error("Error occurred while retrieving the risk histogram - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while retrieving the risk histogram"
+        )
+
+
 @router.get("/GetFileByID/{file_id}", response_model=FileResponse, description="Get file by ID.")
-async def get_file_by_id(file_id: conint(ge=1), db: Session = Depends(get_db)):
+async def get_file_by_id(file_id: conint(ge=1), request: Request, fields: Optional[str] = None,
+                         include: Optional[str] = None):
     """
     Retrieve a file by its ID.
 
     Args:
         file_id (int): The ID of the file to retrieve.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, whose If-None-Match header is compared with the ETag.
+        fields (str, optional): Comma separated fields to return. Defaults to all of them.
+        include (str, optional): Comma separated relationships to return with the plain fields.
 
     Returns:
-        FileResponse: The details of the requested file.
+        FileResponse: The details of the requested file, with its ETag. 304 Not Modified
+        if If-None-Match already holds that ETag.
 
     Raises:
         HTTPException: If the file with the specified ID is not found or an error occurs.
     """
     try:
-        file_retrieved: FileResponse = await get_file_by_id_db(file_id, db)
+        fieldset = parse_fieldset(FileResponse, FILE_RELATIONSHIPS, fields, include)
+        # A client that just wrote reads past the cache, which may not have its change yet.
+        cached = None if reads_from_primary(request) else file_cache.get(file_id)
+
+        if fieldset is not None:
+            if cached is not None:
+                file_retrieved = orjson.loads(cached.body)
+                file_retrieved = {field: file_retrieved[field] for field in fieldset}
+            else:
+                async with open_read_session(request) as db:
+                    file_retrieved = await get_file_row_db(file_id, db, fieldset)
+
+            logger.info("File with id: '%s' - retrieved with fields: %s.", file_id, ",".join(fieldset))
+            # Partial representations are not cached, but carry their own ETag.
+            return CachedEntity(orjson.dumps(file_retrieved), 0).response(request)
+
+        if cached is None:
+            read_at = time.monotonic()
+            async with open_read_session(request) as db:
+                file_retrieved = await get_file_by_id_db(file_id, db)
+                replica = is_replica(db)
+
+            body = FileResponse.model_validate(file_retrieved, from_attributes=True).model_dump_json().encode()
+            cached = file_cache.put(file_id, body, read_at, replica)
+            logger.info("File: '%s' - retrieved to user.", file_retrieved.name)
 
-        logger.info(f"File: '{file_retrieved.name}' - retrieved to user.")
-        return file_retrieved
+        else:
+            logger.info("File with id: '%s' - retrieved from cache.", file_id)
+
+        return cached.response(request)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving file with id: '{file_id}' - {e}")
+        logger.error("Error occurred while retrieving file with id: '%s' - %s", file_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving a file"
         )
 
 
-@router.post("/ShareFileWithUser/", response_model=FileResponse, description="Share file with a user.")
-async def share_file_with_user(file_id: conint(ge=1), user_id: conint(ge=1), db: Session = Depends(get_db)):
+@router.post("/ShareFileWithUser/", response_model=Union[FileResponse, ShareAcknowledgement],
+             description="Share file with a user.")
+async def share_file_with_user(file_id: conint(ge=1), user_id: conint(ge=1), slim: bool = False,
+                               db: AsyncSession = Depends(get_db)):
     """
     Share a file with a group.
 
     Args:
         file_id (int): The ID of the file to share.
         user_id (int): The ID of the user to share the file with.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        slim (bool, optional): Return a ShareAcknowledgement instead of the full FileResponse. Defaults to False.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        FileResponse: The details of the file after sharing.
+        Union[FileResponse, ShareAcknowledgement]: The details of the file after sharing, or just
+        the acknowledgement when slim is set.
 
     Raises:
         HTTPException: If the file or user with the specified IDs are not found, or if an error occurs.
     """
     try:
-        file_shared: FileResponse = await share_file_with_user_db(file_id, user_id, db)
+        file_shared = await share_file_with_user_db(file_id, user_id, db, slim)
 
-        logger.info(f"File: '{file_shared.name}' shared with user.")
+        logger.info("File with id: '%s' shared with user with id: '%s'.", file_id, user_id)
         return file_shared
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        logger.error(f"Error occurred while sharing file with id: '{file_id}' with user with id: '{user_id}' - {e}")
+        logger.error("Error occurred while sharing file with id: '%s' with user with id: '%s' - %s", file_id, user_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while sharing a file with a user"
         )
 
 
-@router.post("/ShareFileWithGroup/", response_model=FileResponse, description="Share file with a group.")
-async def share_file_with_group(file_id: conint(ge=1), group_id: conint(ge=1), db: Session = Depends(get_db)):
+@router.post("/ShareFileWithGroup/", response_model=Union[FileResponse, ShareAcknowledgement],
+             description="Share file with a group.")
+async def share_file_with_group(file_id: conint(ge=1), group_id: conint(ge=1), slim: bool = False,
+                                db: AsyncSession = Depends(get_db)):
     """
     Share a file with a group.
 
     Args:
         file_id (int): The ID of the file to share.
         group_id (int): The ID of the group to share the file with.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        slim (bool, optional): Return a ShareAcknowledgement instead of the full FileResponse. Defaults to False.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        FileResponse: The details of the file after sharing.
+        Union[FileResponse, ShareAcknowledgement]: The details of the file after sharing, or just
+        the acknowledgement when slim is set.
 
     Raises:
         HTTPException: If the file or group with the specified IDs are not found, or if an error occurs.
     """
     try:
-        file_shared: FileResponse = await share_file_with_group_db(file_id, group_id, db)
+        file_shared = await share_file_with_group_db(file_id, group_id, db, slim)
 
-        logger.info(f"File- '{file_shared.name}' shared with a group.")
+        logger.info("File with id: '%s' shared with group with id: '%s'.", file_id, group_id)
         return file_shared
 
     except HTTPException:
         raise
 
     except Exception as e:
-        logger.error(f"Error occurred while sharing file with id: '{file_id}' with group with id: '{group_id}' - {e}")
+        logger.error("Error occurred while sharing file with id: '%s' with group with id: '%s' - %s", file_id, group_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while sharing a file with a group."
         )
 
 
-@router.get("/TopSharedFiles/{k}", response_model=List[FileTopSharedResponse], description="Get top shared files.")
-async def get_top_shared_files(k:  conint(ge=1, le=10) = 5, db: Session = Depends(get_db)):
+@router.post("/ShareFileWithUsers/", response_model=ShareBatchResponse, description="Share file with many users.")
+async def share_file_with_users(share: FileShareWithUsers, db: AsyncSession = Depends(get_db)):
+    """
+    Share a file with a batch of users in a single statement.
+
+    Args:
+        share (FileShareWithUsers): The ID of the file and the IDs of the users to share it with.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        ShareBatchResponse: Whether each user was added, already shared or not found.
+
+    Raises:
+        HTTPException: If the file with the specified ID is not found, or if an error occurs.
+    """
+    try:
+        shared: ShareBatchResponse = await share_file_with_users_db(share.file_id, share.user_ids, db)
+
+        logger.info("File with id: '%s' shared with %s users.", share.file_id, len(share.user_ids))
+        return shared
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        logger.error("Error occurred while sharing file with id: '%s' with users - %s", share.file_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while sharing a file with users"
+        )
+
+
+@router.post("/ShareFileWithGroups/", response_model=ShareBatchResponse, description="Share file with many groups.")
+async def share_file_with_groups(share: FileShareWithGroups, db: AsyncSession = Depends(get_db)):
+    """
+    Share a file with a batch of groups in a single statement.
+
+    Args:
+        share (FileShareWithGroups): The ID of the file and the IDs of the groups to share it with.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        ShareBatchResponse: Whether each group was added, already shared or not found.
+
+    Raises:
+        HTTPException: If the file with the specified ID is not found, or if an error occurs.
+    """
+    try:
+        shared: ShareBatchResponse = await share_file_with_groups_db(share.file_id, share.group_ids, db)
+
+        logger.info("File with id: '%s' shared with %s groups.", share.file_id, len(share.group_ids))
+        return shared
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        logger.error("Error occurred while sharing file with id: '%s' with groups - %s", share.file_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while sharing a file with groups"
+        )
+
+
+@router.get("/TopSharedFiles/{k}",
+            response_model=Union[List[FileTopSharedResponse], FileTopSharedApproximateResponse],
+            description="Get top shared files.")
+async def get_top_shared_files(k:  conint(ge=1, le=10) = 5, approximate: bool = False,
+                               db: AsyncSession = Depends(get_read_db)):
     """
     Retrieve the top shared files.
 
     Args:
         k (int): The number of top shared files to retrieve. Default is 5.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        approximate (bool, optional): Answer from the in-memory share sketches. Defaults to False.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_read_db).
 
     Returns:
         List[FileTopSharedResponse]: A list of FileTopSharedResponse objects representing the top shared files.
+        FileTopSharedApproximateResponse: In approximate mode, the estimated user counts and their error bounds.
 
     Raises:
         HTTPException: If an error occurs during the retrieval process.
     """
     try:
+        if approximate:
+            files_estimated: FileTopSharedApproximateResponse = await get_top_shared_file_approximate_db(k, db)
+
+            logger.info("Top %s shared files estimated.", k)
+            return files_estimated
+
         files_retrieved: List[FileTopSharedResponse] = await get_top_shared_file_db(k, db)
 
-        logger.info(f"Top {k} shared files retrieved.")
+        logger.info("Top %s shared files retrieved.", k)
         return files_retrieved
 
+    except HTTPException:
+        raise
+
     except Exception as e:
-        logger.error(f"Error occurred while retrieving {k} top shared files - {e}")
+        logger.error("Error occurred while retrieving %s top shared files - %s", k, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving top shared files."
         )
+
+
+@router.get("/TopExposed/{k}", response_model=List[FileExposureResponse], description="Get top exposed files.")
+async def get_top_exposed_files(response: Response, k: conint(ge=1, le=1000) = 5,
+                                min_risk: Optional[conint(ge=0, le=100)] = None,
+                                after_exposure: Optional[conint(ge=1)] = None, after_id: Optional[conint(ge=1)] = None,
+                                db: AsyncSession = Depends(get_read_db)):
+    """
+    Retrieve the files with the highest exposure, risk times the number of users they are shared with.
+
+    Args:
+        k (int): The number of files to retrieve. Default is 5.
+        min_risk (int, optional): Return only files with at least this risk.
+        after_exposure (int, optional): The exposure of the file the after_id cursor points at.
+        after_id (int, optional): Return only files ranked after this cursor.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        List[FileExposureResponse]: The files, highest exposure first. When k
+        files are returned, the X-Next-Cursor and X-Next-Exposure headers hold
+        the after_id and after_exposure of the next page.
+
+    Raises:
+        HTTPException: If the cursor is incomplete or an error occurs during the retrieval process.
+    """
+    try:
+        if (after_id is None) != (after_exposure is None):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="after_id and after_exposure must be given together")
+
+        files_retrieved = await get_top_exposed_files_db(k, db, min_risk, after_exposure, after_id)
+
+        if len(files_retrieved) == k:
+            response.headers["X-Next-Cursor"] = str(files_retrieved[-1].id)
+            response.headers["X-Next-Exposure"] = str(files_retrieved[-1].exposure)
+
+        logger.info("Top %s exposed files retrieved.", k)
+        return files_retrieved
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error("Error occurred while retrieving %s top exposed files - %s", k, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while retrieving top exposed files."
+        )
+
+
+async def _check_access(checks: List[Tuple[int, int]]) -> List[bool]:
+    # Checks the index answers need no connection; one is checked out only
+    # when denials have to be confirmed against the database.
+    allowed, denied = check_access_index(checks)
+    if not denied:
+        return allowed
+
+    async with open_session() as db:
+        granted = await confirm_access_db(denied, db)
+
+    return [is_allowed or check in granted for check, is_allowed in zip(checks, allowed)]
+
+
+@router.get("/{file_id}/CanAccess/{user_id}", response_model=AccessCheckResponse,
+            description="Check whether a user can access a file.")
+async def can_access_file(file_id: conint(ge=1), user_id: conint(ge=1)):
+    """
+    Check whether a user can access a file, directly or through a group.
+
+    Args:
+        file_id (int): The ID of the file.
+        user_id (int): The ID of the user.
+
+    Returns:
+        AccessCheckResponse: Whether the user can access the file.
+
+    Raises:
+        HTTPException: If an error occurs during the check.
+    """
+    try:
+        allowed, = await _check_access([(file_id, user_id)])
+
+        return AccessCheckResponse(file_id=file_id, user_id=user_id, allowed=allowed)
+
+    except Exception as e:
+        logger.error("Error occurred while checking access of user with id: '%s' to file with id: '%s' - %s", user_id, file_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while checking file access"
+        )
+
+
+@router.post("/CanAccess/", response_model=List[AccessCheckResponse], description="Check file access in batch.")
+async def can_access_files(batch: AccessCheckBatch):
+    """
+    Check a batch of (file, user) pairs for access.
+
+    Args:
+        batch (AccessCheckBatch): The file and user IDs to check.
+
+    Returns:
+        List[AccessCheckResponse]: Whether each user can access each file, in request order.
+
+    Raises:
+        HTTPException: If an error occurs during the check.
+    """
+    try:
+        checks = [(check.file_id, check.user_id) for check in batch.checks]
+        allowed = await _check_access(checks)
+
+        logger.info("%s file access checks answered.", len(checks))
+        return [AccessCheckResponse(file_id=file_id, user_id=user_id, allowed=is_allowed)
+                for (file_id, user_id), is_allowed in zip(checks, allowed)]
+
+    except Exception as e:
+        logger.error("Error occurred while checking file access in batch - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while checking file access"
+        )
@@ -1,14 +1,28 @@
 import logging
-from typing import List
+import time
+from typing import AsyncIterator, List, Optional, Sequence, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import conint
-from sqlalchemy.orm import Session
-
-from app.database.database import get_db
-from app.database.operations.groups import (create_group_db, get_all_groups_db,
-                                            get_group_by_id_db, share_group_with_user_db)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.config import STREAM_CHUNK_SIZE
+from app.database.database import get_db, is_replica, open_read_session
+from app.database.operations.groups import (GROUP_RELATIONSHIPS, GROUP_RESPONSE_FIELDS,
+                                            create_group_db, bulk_create_groups_db,
+                                            get_all_groups_db, stream_groups_db,
+                                            get_group_rows_db, stream_group_rows_db,
+                                            get_group_by_id_db, get_group_row_db, share_group_with_user_db,
+                                            share_group_with_users_db)
+from app.schemas.bulk import BulkCreateResponse
 from app.schemas.group import GroupCreate, GroupResponse
+from app.schemas.share import GroupShareWithUsers, ShareAcknowledgement, ShareBatchResponse
+from app.utils.bulk import BULK_CREATE_REQUEST_BODY, BulkRecordError, iter_bulk_records
+from app.utils.entity_cache import CachedEntity, group_cache
+from app.utils.fieldsets import parse_fieldset
+from app.utils.read_your_writes import reads_from_primary
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +31,13 @@ router = APIRouter(prefix="/groups", tags=["groups"])
 
 
 @router.post("/CreateGroup/", response_model=GroupResponse, description="Create a new group")
-async def create_group(group: GroupCreate, db: Session = Depends(get_db)):
+async def create_group(group: GroupCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new user group.
 
     Args:
         group (GroupCreate): The details of the group to be created.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         GroupResponse: The details of the created group.
@@ -31,98 +45,248 @@ async def create_group(group: GroupCreate, db: Session = Depends(get_db)):
     try:
         created_group: GroupResponse = await create_group_db(group, db)
 
-        logger.info(f"Group- '{group.name}' created.")
+        logger.info("Group- '%s' created.", group.name)
         return created_group
 
     except Exception as e:
-        logger.error(f"Error occurred while creating group: '{group.name}' - {e}")
+        logger.error("Error occurred while creating group: '%s' - %s", group.name, e)
         raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="An error occurred while creating a group")
 
 
+@router.post("/BulkCreateGroups/", response_model=BulkCreateResponse, description="Create groups from an NDJSON or CSV body.",
+             openapi_extra=BULK_CREATE_REQUEST_BODY)
+async def bulk_create_groups(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Create many groups from an NDJSON or CSV request body.
+
+    Args:
+        request (Request): The request, whose body holds one GroupCreate per line (CSV starts with a header row).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        BulkCreateResponse: The IDs of the created groups, in input order.
+
+    Raises:
+        HTTPException: If any record is invalid (nothing is created), or if an error occurs.
+    """
+    try:
+        group_ids = await bulk_create_groups_db(iter_bulk_records(request, GroupCreate), db)
+
+        logger.info("%s groups created in bulk.", len(group_ids))
+        return BulkCreateResponse(ids=group_ids)
+
+    except BulkRecordError as e:
+        logger.error("Invalid records in bulk groups creation - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors
+        )
+
+    except Exception as e:
+        logger.error("Error occurred during bulk creation of groups - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while creating groups"
+        )
+
+
+async def _stream_groups(request: Request, after_id: Optional[int], limit: Optional[int],
+                         fields: Optional[Sequence[str]]) -> AsyncIterator[Union[str, bytes]]:
+    try:
+        async with open_read_session(request) as db:
+            if fields is not None:
+                async for group in stream_group_rows_db(db, STREAM_CHUNK_SIZE, after_id, limit, fields):
+                    yield orjson.dumps(group) + b"\n"
+            else:
+                async for group in stream_groups_db(db, STREAM_CHUNK_SIZE, after_id, limit):
+                    yield GroupResponse.model_validate(group, from_attributes=True).model_dump_json() + "\n"
+
+    except Exception as e:
+        logger.error("Error occurred while streaming groups - %s", e)
+        raise
+
+
 @router.get("/GetAllGroups/", response_model=List[GroupResponse], description="Get all groups")
-async def get_all_groups(db: Session = Depends(get_db)):
+async def get_all_groups(request: Request, response: Response, after_id: Optional[conint(ge=1)] = None,
+                         limit: Optional[conint(ge=1, le=1000)] = None, stream: bool = False,
+                         fast: bool = False, fields: Optional[str] = None, include: Optional[str] = None):
     """
-    Retrieve all user groups.
+    Retrieve all user groups, optionally one keyset page at a time.
 
     Args:
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, used to pick the replica or the primary.
+        after_id (int, optional): Return only groups with an ID greater than this cursor.
+        limit (int, optional): The maximum number of groups to return.
+        stream (bool, optional): Stream the groups as NDJSON instead of a JSON list. Defaults to False.
+        fast (bool, optional): Select plain columns and encode them with orjson, skipping per-object
+            validation. The output is the same. Defaults to False.
+        fields (str, optional): Comma separated fields to return. Defaults to all of them.
+        include (str, optional): Comma separated relationships to return with the plain fields.
 
     Returns:
-        List[GroupResponse]: A list of all user groups.
+        List[GroupResponse]: A list of all user groups. When the page is full, the
+        X-Next-Cursor header holds the after_id of the next page.
     """
     try:
-        groups_retrieved: List[GroupResponse] = await get_all_groups_db(db)
+        fieldset = parse_fieldset(GroupResponse, GROUP_RELATIONSHIPS, fields, include)
+        row_fields = fieldset or (GROUP_RESPONSE_FIELDS if fast else None)
+
+        if stream:
+            logger.info("Streaming groups after id: '%s'.", after_id)
+            return StreamingResponse(_stream_groups(request, after_id, limit, row_fields), media_type="application/x-ndjson")
+
+        async with open_read_session(request) as db:
+            if row_fields is not None:
+                groups_retrieved, last_id = await get_group_rows_db(db, after_id, limit, row_fields)
+                headers = ({"X-Next-Cursor": str(last_id)}
+                           if limit is not None and len(groups_retrieved) == limit else None)
+
+                logger.info("All groups retrieved.")
+                return ORJSONResponse(groups_retrieved, headers=headers)
+
+            groups_retrieved = await get_all_groups_db(db, after_id, limit)
 
-        logger.info(f"All groups retrieved.")
-        return groups_retrieved
+            if limit is not None and len(groups_retrieved) == limit:
+                response.headers["X-Next-Cursor"] = str(groups_retrieved[-1].id)
+
+            logger.info("All groups retrieved.")
+            return groups_retrieved
+
+    except HTTPException:
+        raise
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving all groups - {e}")
+        logger.error("Error occurred while retrieving all groups - %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving groups")
 
 
 @router.get("/GetGroupByID/{group_id}", response_model=GroupResponse, description="Get group by ID")
-async def get_group_by_id(group_id: conint(ge=1), db: Session = Depends(get_db)):
+async def get_group_by_id(group_id: conint(ge=1), request: Request, fields: Optional[str] = None,
+                          include: Optional[str] = None):
     """
     Retrieve a user group by its ID.
 
     Args:
         group_id (int): The ID of the group to retrieve.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, whose If-None-Match header is compared with the ETag.
+        fields (str, optional): Comma separated fields to return. Defaults to all of them.
+        include (str, optional): Comma separated relationships to return with the plain fields.
 
     Returns:
-        GroupResponse: The details of the requested group.
+        GroupResponse: The details of the requested group, with its ETag. 304 Not Modified
+        if If-None-Match already holds that ETag.
 
     Raises:
         HTTPException: If the group with the specified ID is not found or an error occurs.
     """
     try:
-        group_retrieved: GroupResponse = await get_group_by_id_db(group_id, db)
+        fieldset = parse_fieldset(GroupResponse, GROUP_RELATIONSHIPS, fields, include)
+        # A client that just wrote reads past the cache, which may not have its change yet.
+        cached = None if reads_from_primary(request) else group_cache.get(group_id)
+
+        if fieldset is not None:
+            if cached is not None:
+                group_retrieved = orjson.loads(cached.body)
+                group_retrieved = {field: group_retrieved[field] for field in fieldset}
+            else:
+                async with open_read_session(request) as db:
+                    group_retrieved = await get_group_row_db(group_id, db, fieldset)
+
+            logger.info("Group with id: '%s' - retrieved with fields: %s.", group_id, ",".join(fieldset))
+            # Partial representations are not cached, but carry their own ETag.
+            return CachedEntity(orjson.dumps(group_retrieved), 0).response(request)
+
+        if cached is None:
+            read_at = time.monotonic()
+            async with open_read_session(request) as db:
+                group_retrieved = await get_group_by_id_db(group_id, db)
+                replica = is_replica(db)
 
-        logger.info(f"Group: '{group_retrieved.name}' - retrieved.")
-        return group_retrieved
+            body = GroupResponse.model_validate(group_retrieved, from_attributes=True).model_dump_json().encode()
+            cached = group_cache.put(group_id, body, read_at, replica)
+            logger.info("Group: '%s' - retrieved.", group_retrieved.name)
+
+        else:
+            logger.info("Group with id: '%s' - retrieved from cache.", group_id)
+
+        return cached.response(request)
 
     except HTTPException:
         raise
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving group with id: {group_id} - {e}")
+        logger.error("Error occurred while retrieving group with id: %s - %s", group_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving a group")
 
 
-@router.post("/ShareGroupWithUser/", response_model=GroupResponse, description="Share file with a user.")
-async def share_group_with_user(group_id: conint(ge=1), user_id: conint(ge=1), db: Session = Depends(get_db)):
+@router.post("/ShareGroupWithUser/", response_model=Union[GroupResponse, ShareAcknowledgement],
+             description="Share file with a user.")
+async def share_group_with_user(group_id: conint(ge=1), user_id: conint(ge=1), slim: bool = False,
+                                db: AsyncSession = Depends(get_db)):
     """
     Share a group with a user.
 
     Args:
         user_id (int): The ID of the user to share.
         group_id (int): The ID of the group to share the group with.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        slim (bool, optional): Return a ShareAcknowledgement instead of the full GroupResponse. Defaults to False.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
-        FileResponse: The details of the Group after sharing.
+        Union[GroupResponse, ShareAcknowledgement]: The details of the Group after sharing, or just
+        the acknowledgement when slim is set.
 
     Raises:
         HTTPException: If the user or group with the specified IDs are not found, or if an error occurs.
     """
     try:
-        group_shared: GroupResponse = await share_group_with_user_db(group_id, user_id, db)
+        group_shared = await share_group_with_user_db(group_id, user_id, db, slim)
 
-        logger.info(f"Group: '{group_shared.name}' shared with user.")
+        logger.info("Group with id: '%s' shared with user with id: '%s'.", group_id, user_id)
         return group_shared
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        logger.error(f"Error occurred while sharing group with id: '{group_id}' with user with id: '{user_id}' - {e}")
+        logger.error("Error occurred while sharing group with id: '%s' with user with id: '%s' - %s", group_id, user_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while sharing a group with user")
+
+
+@router.post("/ShareGroupWithUsers/", response_model=ShareBatchResponse, description="Share group with many users.")
+async def share_group_with_users(share: GroupShareWithUsers, db: AsyncSession = Depends(get_db)):
+    """
+    Share a group with a batch of users in a single statement.
+
+    Args:
+        share (GroupShareWithUsers): The ID of the group and the IDs of the users to add to it.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        ShareBatchResponse: Whether each user was added, already shared or not found.
+
+    Raises:
+        HTTPException: If the group with the specified ID is not found, or if an error occurs.
+    """
+    try:
+        shared: ShareBatchResponse = await share_group_with_users_db(share.group_id, share.user_ids, db)
+
+        logger.info("Group with id: '%s' shared with %s users.", share.group_id, len(share.user_ids))
+        return shared
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        logger.error("Error occurred while sharing group with id: '%s' with users - %s", share.group_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while sharing a group with users")
@@ -1,15 +1,26 @@
 import logging
-from typing import List
+import time
+from typing import AsyncIterator, List, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import conint
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
-from app.database.database import get_db
-from app.database.operations.users import (create_user_db,
-                                           get_all_users_db, get_user_by_id_db)
+from app.config.config import STREAM_CHUNK_SIZE
+from app.database.database import get_db, get_read_db, is_replica, open_read_session
+from app.database.operations.users import (create_user_db, bulk_create_users_db, get_all_users_db,
+                                           stream_users_db, get_user_rows_db, stream_user_rows_db,
+                                           get_user_by_id_db,
+                                           get_accessible_files_db)
+from app.schemas.bulk import BulkCreateResponse
+from app.schemas.file import FileAccessibleResponse
 from app.schemas.user import UserCreate, UserResponse
+from app.utils.bulk import BULK_CREATE_REQUEST_BODY, BulkRecordError, iter_bulk_records
+from app.utils.entity_cache import user_cache
+from app.utils.read_your_writes import reads_from_primary
 
 
 logger = logging.getLogger(__name__)
@@ -18,13 +29,13 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("/CreateUser/", response_model=UserResponse, description="Create a new user")
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new user.
 
     Args:
         user (UserCreate): The details of the user to be created.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
 
     Returns:
         UserResponse: The details of the created user.
@@ -35,70 +46,202 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     try:
         created_user: UserCreate = await create_user_db(user, db)
 
-        logger.info(f"User- '{user.name}' created.")
+        logger.info("User- '%s' created.", user.name)
         return created_user
 
     except Exception as e:
-        logger.error(f"Error occurred while creating user: '{user.name}' - {e}")
+        logger.error("Error occurred while creating user: '%s' - %s", user.name, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while creating user"
         )
 
 
+@router.post("/BulkCreateUsers/", response_model=BulkCreateResponse, description="Create users from an NDJSON or CSV body.",
+             openapi_extra=BULK_CREATE_REQUEST_BODY)
+async def bulk_create_users(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Create many users from an NDJSON or CSV request body.
+
+    Args:
+        request (Request): The request, whose body holds one UserCreate per line (CSV starts with a header row).
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_db).
+
+    Returns:
+        BulkCreateResponse: The IDs of the created users, in input order.
+
+    Raises:
+        HTTPException: If any record is invalid (nothing is created), or if an error occurs.
+    """
+    try:
+        user_ids = await bulk_create_users_db(iter_bulk_records(request, UserCreate), db)
+
+        logger.info("%s users created in bulk.", len(user_ids))
+        return BulkCreateResponse(ids=user_ids)
+
+    except BulkRecordError as e:
+        logger.error("Invalid records in bulk users creation - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors
+        )
+
+    except Exception as e:
+        logger.error("Error occurred during bulk creation of users - %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while creating users"
+        )
+
+
+async def _stream_users(request: Request, after_id: Optional[int], limit: Optional[int],
+                        fast: bool) -> AsyncIterator[Union[str, bytes]]:
+    try:
+        async with open_read_session(request) as db:
+            if fast:
+                async for user in stream_user_rows_db(db, STREAM_CHUNK_SIZE, after_id, limit):
+                    yield orjson.dumps(user) + b"\n"
+            else:
+                async for user in stream_users_db(db, STREAM_CHUNK_SIZE, after_id, limit):
+                    yield UserResponse.model_validate(user, from_attributes=True).model_dump_json() + "\n"
+
+    except Exception as e:
+        logger.error("Error occurred while streaming users - %s", e)
+        raise
+
+
 @router.get("/GetAllUsers/", response_model=List[UserResponse], description="Get all users")
-async def get_all_users(db: Session = Depends(get_db)):
+async def get_all_users(request: Request, response: Response, after_id: Optional[conint(ge=1)] = None,
+                        limit: Optional[conint(ge=1, le=1000)] = None, stream: bool = False,
+                        fast: bool = False):
     """
-    Retrieve all users.
+    Retrieve all users, optionally one keyset page at a time.
 
     Args:
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, used to pick the replica or the primary.
+        after_id (int, optional): Return only users with an ID greater than this cursor.
+        limit (int, optional): The maximum number of users to return.
+        stream (bool, optional): Stream the users as NDJSON instead of a JSON list. Defaults to False.
+        fast (bool, optional): Select plain columns and encode them with orjson, skipping per-object
+            validation. The output is the same. Defaults to False.
 
     Returns:
-        List[UserResponse]: A list of all users.
+        List[UserResponse]: A list of all users. When the page is full, the
+        X-Next-Cursor header holds the after_id of the next page.
 
     Raises:
         HTTPException: If an error occurs during the retrieval process.
     """
     try:
-        users_retrieved: List[UserResponse] = await get_all_users_db(db)
+        if stream:
+            logger.info("Streaming users after id: '%s'.", after_id)
+            return StreamingResponse(_stream_users(request, after_id, limit, fast), media_type="application/x-ndjson")
+
+        async with open_read_session(request) as db:
+            if fast:
+                users_retrieved, last_id = await get_user_rows_db(db, after_id, limit)
+                headers = ({"X-Next-Cursor": str(last_id)}
+                           if limit is not None and len(users_retrieved) == limit else None)
+
+                logger.info("All users retrieved.")
+                return ORJSONResponse(users_retrieved, headers=headers)
 
-        logger.info(f"All users retrieved.")
-        return users_retrieved
+            users_retrieved = await get_all_users_db(db, after_id, limit)
+
+            if limit is not None and len(users_retrieved) == limit:
+                response.headers["X-Next-Cursor"] = str(users_retrieved[-1].id)
+
+            logger.info("All users retrieved.")
+            return users_retrieved
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving all users - {e}")
+        logger.error("Error occurred while retrieving all users - %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving users")
 
 
 @router.get("/GetUserByID/{user_id}", response_model=UserResponse, description="Get user by ID")
-async def get_user_by_id(user_id: conint(ge=1), db: Session = Depends(get_db)):
+async def get_user_by_id(user_id: conint(ge=1), request: Request):
     """
     Retrieve a user by its ID.
 
     Args:
         user_id (int): The ID of the user to retrieve.
-        db (Session, optional): The database session. Defaults to Depends(get_db).
+        request (Request): The request, whose If-None-Match header is compared with the ETag.
 
     Returns:
-        UserResponse: The details of the requested user.
+        UserResponse: The details of the requested user, with its ETag. 304 Not Modified
+        if If-None-Match already holds that ETag.
 
     Raises:
         HTTPException: If the user with the specified ID is not found or an error occurs.
     """
     try:
-        user_retrieved: UserResponse = await get_user_by_id_db(user_id, db)
+        # A client that just wrote reads past the cache, which may not have its change yet.
+        cached = None if reads_from_primary(request) else user_cache.get(user_id)
+
+        if cached is None:
+            read_at = time.monotonic()
+            async with open_read_session(request) as db:
+                user_retrieved = await get_user_by_id_db(user_id, db)
+                replica = is_replica(db)
+
+            body = UserResponse.model_validate(user_retrieved, from_attributes=True).model_dump_json().encode()
+            cached = user_cache.put(user_id, body, read_at, replica)
+            logger.info("User: '%s' - retrieved.", user_retrieved.name)
 
-        logger.info(f"User: '{user_retrieved.name}' - retrieved.")
-        return user_retrieved
+        else:
+            logger.info("User with id: '%s' - retrieved from cache.", user_id)
+
+        return cached.response(request)
 
     except HTTPException as http_exc:
         raise http_exc
 
     except Exception as e:
-        logger.error(f"Error occurred while retrieving user with id: '{user_id}' - {e}")
+        logger.error("Error occurred while retrieving user with id: '%s' - %s", user_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while retrieving user")
+
+
+@router.get("/{user_id}/AccessibleFiles", response_model=List[FileAccessibleResponse],
+            description="Get files a user can access")
+async def get_accessible_files(response: Response, user_id: conint(ge=1), after_id: Optional[conint(ge=1)] = None,
+                               min_risk: Optional[conint(ge=0, le=100)] = None,
+                               limit: conint(ge=1, le=1000) = 100, db: AsyncSession = Depends(get_read_db)):
+    """
+    Retrieve the files a user can access, directly or through a group, one keyset page at a time.
+
+    Args:
+        user_id (int): The ID of the user.
+        after_id (int, optional): Return only files with an ID greater than this cursor.
+        min_risk (int, optional): Return only files with at least this risk.
+        limit (int, optional): The maximum number of files to return. Default is 100.
+        db (AsyncSession, optional): The database session. Defaults to Depends(get_read_db).
+
+    Returns:
+        List[FileAccessibleResponse]: The accessible files ordered by ID. When the page is
+        full, the X-Next-Cursor header holds the after_id of the next page.
+
+    Raises:
+        HTTPException: If the user with the specified ID is not found or an error occurs.
+    """
+    try:
+        files_retrieved = await get_accessible_files_db(user_id, db, after_id, min_risk, limit)
+
+        if len(files_retrieved) == limit:
+            response.headers["X-Next-Cursor"] = str(files_retrieved[-1].id)
+
+        logger.info("Accessible files of user with id: '%s' retrieved.", user_id)
+        return files_retrieved
+
+    except HTTPException as http_exc:
+        raise http_exc
+
+    except Exception as e:
+        logger.error("Error occurred while retrieving accessible files of user with id: '%s' - %s", user_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while retrieving accessible files")
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field, conint
+from typing import List
+
+
+class AccessCheck(BaseModel):
+    file_id: conint(ge=1)
+    user_id: conint(ge=1)
+
+    class Config:
+        extra = "forbid"
+
+
+class AccessCheckBatch(BaseModel):
+    checks: List[AccessCheck] = Field(..., min_length=1, max_length=10000)
+
+    class Config:
+        extra = "forbid"
+
+
+class AccessCheckResponse(BaseModel):
+    file_id: int
+    user_id: int
+    allowed: bool
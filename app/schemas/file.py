@@ -1,3 +1,4 @@
+from enum import Enum
 from pydantic import BaseModel,conint, Field
 from typing import List, Optional
 
@@ -13,6 +14,12 @@ class FileCreate(BaseModel):
         extra = "forbid"
 
 
+class FileSort(str, Enum):
+    id = "id"
+    risk = "risk"
+    risk_desc = "-risk"
+
+
 class FileResponse(BaseModel):
     name: str
     risk: int
@@ -20,7 +27,45 @@ class FileResponse(BaseModel):
     groups: List[GroupShared]
 
 
+class FileAccessibleResponse(BaseModel):
+    id: int
+    name: str
+    risk: int
+
+
 class FileTopSharedResponse(BaseModel):
     name: str
     risk: int
     users: List[str]
+
+
+class FileExposureResponse(BaseModel):
+    id: int
+    name: str
+    risk: int
+    shared_users_count: int
+    exposure: int
+
+
+class FileTopSharedEstimate(BaseModel):
+    name: str
+    risk: int
+    estimated_users_count: int
+    error_bound: int
+
+
+class FileTopSharedApproximateResponse(BaseModel):
+    relative_error: float
+    files: List[FileTopSharedEstimate]
+
+
+class FileRiskBucket(BaseModel):
+    min_risk: int
+    max_risk: int
+    files: int
+
+
+class FileRiskHistogramResponse(BaseModel):
+    bucket_size: int
+    total: int
+    buckets: List[FileRiskBucket]
@@ -0,0 +1,62 @@
+from enum import Enum
+from pydantic import BaseModel, Field, conint
+from typing import Iterable, List, Set
+
+
+class ShareStatus(str, Enum):
+    added = "added"
+    already_shared = "already_shared"
+    not_found = "not_found"
+
+
+class FileShareWithUsers(BaseModel):
+    file_id: conint(ge=1)
+    user_ids: List[conint(ge=1)] = Field(..., min_length=1, max_length=10000)
+
+    class Config:
+        extra = "forbid"
+
+
+class FileShareWithGroups(BaseModel):
+    file_id: conint(ge=1)
+    group_ids: List[conint(ge=1)] = Field(..., min_length=1, max_length=10000)
+
+    class Config:
+        extra = "forbid"
+
+
+class GroupShareWithUsers(BaseModel):
+    group_id: conint(ge=1)
+    user_ids: List[conint(ge=1)] = Field(..., min_length=1, max_length=10000)
+
+    class Config:
+        extra = "forbid"
+
+
+class ShareResult(BaseModel):
+    id: int
+    status: ShareStatus
+
+
+class ShareAcknowledgement(BaseModel):
+    id: int
+    shared_with_id: int
+    status: ShareStatus = ShareStatus.added
+
+
+class ShareBatchResponse(BaseModel):
+    results: List[ShareResult]
+
+
+def build_share_results(requested_ids: Iterable[int], found_ids: Set[int], added_ids: Set[int]) -> ShareBatchResponse:
+    results = []
+    for requested_id in requested_ids:
+        if requested_id in added_ids:
+            share_status = ShareStatus.added
+        elif requested_id in found_ids:
+            share_status = ShareStatus.already_shared
+        else:
+            share_status = ShareStatus.not_found
+        results.append(ShareResult(id=requested_id, status=share_status))
+
+    return ShareBatchResponse(results=results)
@@ -0,0 +1,103 @@
+"""
+Production entry point: `python -m app.server`.
+
+Runs WEB_CONCURRENCY worker processes (one per CPU by default) under uvicorn's
+process manager, so throughput scales across cores. Workers use uvloop and
+httptools when they are installed. Send SIGHUP to restart the workers one at a
+time, each finishing its in-flight requests first. The manager also replaces
+workers that die or reach WEB_MAX_REQUESTS.
+
+Every worker has its own connection pool. When DB_MAX_CONNECTIONS is set, the
+config caps each pool at an even share of that budget (less
+DB_RESERVED_CONNECTIONS), so all workers together never exceed it. The
+launcher tells the workers how many of them share it through
+WEB_WORKER_PROCESSES; processes started any other way keep their whole pool.
+
+The schema is created here, once, before the workers start; workers skip
+their own create_all so they do not race on an empty database. The launcher
+also owns the log file: workers send their records to its LogReceiver over a
+Unix socket, so the file is rotated by a single process.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import uvicorn
+
+from app.config.config import (DB_MAX_CONNECTIONS, DB_RESERVED_CONNECTIONS,
+                               DB_CONNECT_RETRIES, DB_CONNECT_BACKOFF_SECONDS, DB_CONNECT_BACKOFF_MAX_SECONDS,
+                               DB_SKIP_DDL, FASTAPI_PORT, WEB_CONCURRENCY, WEB_GRACEFUL_TIMEOUT_SECONDS, WEB_HOST,
+                               LOG_SOCKET, WEB_KEEPALIVE_SECONDS, WEB_MAX_REQUESTS, worker_pool_limits)
+from app.database.database import create_database, engine, wait_for_database
+from app import models  # noqa: F401 - registers the tables for create_database
+from app.utils.logger import LogReceiver, file_handler
+
+logger = logging.getLogger(__name__)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+async def prepare_database():
+    """Wait for the database and create the schema, then close the launcher's connections."""
+    try:
+        await wait_for_database(DB_CONNECT_RETRIES, DB_CONNECT_BACKOFF_SECONDS, DB_CONNECT_BACKOFF_MAX_SECONDS)
+        await create_database()
+
+    finally:
+        await engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    workers = WEB_CONCURRENCY or os.cpu_count() or 1
+
+    if DB_MAX_CONNECTIONS > 0 and workers > DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS:
+        sys.exit(f"{workers} workers need at least {workers + DB_RESERVED_CONNECTIONS} "
+                 f"connections, but DB_MAX_CONNECTIONS is {DB_MAX_CONNECTIONS}")
+
+    if not DB_SKIP_DDL:
+        asyncio.run(prepare_database())
+        logger.info("Schema created.")
+        # Workers inherit the environment and read their config on import.
+        os.environ["DB_SKIP_DDL"] = "true"
+
+    # Workers split the connection budget between this many processes.
+    os.environ["WEB_WORKER_PROCESSES"] = str(workers)
+    pool_size, max_overflow = worker_pool_limits(workers)
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+
+    logger.info("Starting %d workers on %s:%d (loop=%s, http=%s, pool=%d+%d per worker).",
+                workers, WEB_HOST, FASTAPI_PORT, loop, http, pool_size, max_overflow)
+
+    receiver = socket_dir = None
+    if not LOG_SOCKET:
+        # mkdtemp creates the directory 0700, so only this user can send records.
+        socket_dir = tempfile.mkdtemp(prefix="app-log-")
+        receiver = LogReceiver(os.path.join(socket_dir, "log.sock"), file_handler())
+        receiver.start()
+        os.environ["LOG_SOCKET"] = receiver.server_address
+
+    try:
+        uvicorn.run("app.main:app", host=WEB_HOST, port=FASTAPI_PORT, workers=workers,
+                    loop=loop, http=http, proxy_headers=True, access_log=False,
+                    timeout_keep_alive=WEB_KEEPALIVE_SECONDS,
+                    timeout_graceful_shutdown=WEB_GRACEFUL_TIMEOUT_SECONDS,
+                    limit_max_requests=WEB_MAX_REQUESTS or None)
+
+    finally:
+        if receiver is not None:
+            receiver.stop()
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from typing import Dict, Iterable
+
+from app.utils.bitmap import CompressedBitmap
+
+
+class AccessIndex:
+    """
+    In-memory answer to "can user U read file F?".
+
+    Each user has a bitmap of every file they can reach, with group shares
+    already expanded: sharing a file with a group adds it to every member's
+    bitmap, and adding a user to a group merges the group's files into theirs.
+    Shares are never revoked, so the bitmaps only grow and a positive answer
+    is always correct.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._user_files: Dict[int, CompressedBitmap] = {}
+        self._group_files: Dict[int, CompressedBitmap] = {}
+        self._group_users: Dict[int, CompressedBitmap] = {}
+        self.ready = False
+
+    def replace(self, other: "AccessIndex"):
+        self._user_files = other._user_files
+        self._group_files = other._group_files
+        self._group_users = other._group_users
+        self.ready = True
+
+    def can_access(self, file_id: int, user_id: int) -> bool:
+        files = self._user_files.get(user_id)
+        return files is not None and file_id in files
+
+    def share_file_with_users(self, file_id: int, user_ids: Iterable[int]):
+        for user_id in user_ids:
+            self._files_of_user(user_id).add(file_id)
+
+    def share_file_with_groups(self, file_id: int, group_ids: Iterable[int]):
+        for group_id in group_ids:
+            if not self._files_of_group(group_id).add(file_id):
+                continue
+
+            for user_id in self._group_users.get(group_id, ()):
+                self._files_of_user(user_id).add(file_id)
+
+    def share_group_with_users(self, group_id: int, user_ids: Iterable[int]):
+        members = self._group_users.setdefault(group_id, CompressedBitmap())
+        group_files = self._group_files.get(group_id)
+
+        for user_id in user_ids:
+            if members.add(user_id) and group_files is not None:
+                self._files_of_user(user_id).update(group_files)
+
+    def _files_of_user(self, user_id: int) -> CompressedBitmap:
+        files = self._user_files.get(user_id)
+        if files is None:
+            files = self._user_files[user_id] = CompressedBitmap()
+        return files
+
+    def _files_of_group(self, group_id: int) -> CompressedBitmap:
+        files = self._group_files.get(group_id)
+        if files is None:
+            files = self._group_files[group_id] = CompressedBitmap()
+        return files
@@ -0,0 +1,96 @@
+from typing import Dict, Iterable, Iterator, Set, Union
+
+_CHUNK_BITS = 16
+_CHUNK_SIZE = 1 << _CHUNK_BITS
+_LOW_MASK = _CHUNK_SIZE - 1
+_ARRAY_LIMIT = 4096
+
+
+class _BitmapContainer:
+    __slots__ = ("bits", "cardinality")
+
+    def __init__(self, values: Iterable[int]):
+        self.bits = bytearray(_CHUNK_SIZE // 8)
+        self.cardinality = 0
+        for value in values:
+            self.add(value)
+
+    def add(self, value: int) -> bool:
+        byte, mask = value >> 3, 1 << (value & 7)
+        if self.bits[byte] & mask:
+            return False
+
+        self.bits[byte] |= mask
+        self.cardinality += 1
+        return True
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self.bits[value >> 3] & (1 << (value & 7)))
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_index, byte in enumerate(self.bits):
+            while byte:
+                lowest = byte & -byte
+                yield (byte_index << 3) | (lowest.bit_length() - 1)
+                byte ^= lowest
+
+
+Container = Union[Set[int], _BitmapContainer]
+
+
+class CompressedBitmap:
+    """
+    Roaring-style set of non-negative integers.
+
+    Values are split into chunks by their high 16 bits. A chunk holds a plain
+    set of low bits while it is sparse and switches to an 8 KiB bitmap once it
+    passes 4096 values, so memory follows the number of values rather than
+    the largest one, and membership is a dict lookup plus a bit test.
+    """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self._containers: Dict[int, Container] = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value: int) -> bool:
+        """Add a value, returning True if it was not already present."""
+        key, low = value >> _CHUNK_BITS, value & _LOW_MASK
+        container = self._containers.get(key)
+
+        if container is None:
+            self._containers[key] = {low}
+            return True
+
+        if isinstance(container, set):
+            if low in container:
+                return False
+
+            container.add(low)
+            if len(container) > _ARRAY_LIMIT:
+                self._containers[key] = _BitmapContainer(container)
+            return True
+
+        return container.add(low)
+
+    def update(self, values: Iterable[int]):
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> _CHUNK_BITS)
+        return container is not None and (value & _LOW_MASK) in container
+
+    def __iter__(self) -> Iterator[int]:
+        for key in sorted(self._containers):
+            container = self._containers[key]
+            base = key << _CHUNK_BITS
+            lows = sorted(container) if isinstance(container, set) else container
+            for low in lows:
+                yield base | low
+
+    def __len__(self) -> int:
+        return sum(len(container) if isinstance(container, set) else container.cardinality
+                   for container in self._containers.values())
@@ -0,0 +1,86 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Tuple, Type, TypeVar
+
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+
+MAX_REPORTED_ERRORS = 100
+
+BULK_CREATE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/x-ndjson": {"schema": {"type": "string"}},
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+Record = TypeVar("Record", bound=BaseModel)
+
+
+class BulkRecordError(Exception):
+    def __init__(self, errors: List[dict]):
+        super().__init__(f"{len(errors)} invalid records")
+        self.errors = errors
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    line_number = 0
+
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_number + 1, pending.rstrip("\r")
+
+
+async def iter_bulk_records(request: Request, schema: Type[Record]) -> AsyncIterator[Record]:
+    """
+    Parse an NDJSON or CSV request body into validated records as it streams in.
+
+    CSV bodies start with a header row naming the fields. Invalid lines are
+    collected, and once the body is exhausted BulkRecordError is raised if
+    there were any, so the caller can roll back everything it inserted.
+    """
+    is_csv = "csv" in request.headers.get("content-type", "")
+    header = None
+    errors = []
+
+    async for line_number, line in _iter_lines(request):
+        if not line.strip():
+            continue
+
+        try:
+            if not is_csv:
+                row = json.loads(line)
+            elif header is None:
+                header = next(csv.reader([line]))
+                continue
+            else:
+                row = dict(zip(header, next(csv.reader([line]))))
+
+            record = schema.model_validate(row)
+
+        except (ValidationError, ValueError) as e:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+            else:
+                break
+
+            continue
+
+        if not errors:
+            yield record
+
+    if errors:
+        raise BulkRecordError(errors)
@@ -0,0 +1,122 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.config.config import (ENTITY_CACHE_ENABLED, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS,
+                               READ_YOUR_WRITES_SECONDS)
+
+
+class CachedEntity:
+    """A serialized response body and its strong ETag."""
+
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.expires_at = expires_at
+
+    def response(self, request: Request) -> Response:
+        """Answer 304 if the client already holds this version, else the cached body."""
+        headers = {"ETag": self.etag}
+        if _etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class EntityCache:
+    """
+    Bounded LRU cache of serialized responses keyed by entity ID.
+
+    Entries expire after `ttl` seconds so that changes made by other worker
+    processes are picked up; changes made by this process invalidate the
+    affected entries directly. A ttl of 0 disables expiry.
+
+    Each invalidation leaves a tombstone holding its time for
+    `tombstone_seconds`, so a read of that entity which started before it
+    (or came from a replica shortly after it) is not cached. Reads of other
+    entities are unaffected.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, enabled: bool = True,
+                 tombstone_seconds: float = max(READ_YOUR_WRITES_SECONDS, 1.0)):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled and max_entries > 0
+        self.tombstone_seconds = tombstone_seconds
+        self._entries: "OrderedDict[int, CachedEntity]" = OrderedDict()
+        # Key -> monotonic() time of its last invalidation, oldest first.
+        self._tombstones: "OrderedDict[int, float]" = OrderedDict()
+        # Tombstones older than this have been dropped.
+        self._pruned_until = float("-inf")
+
+    def get(self, key: int) -> Optional[CachedEntity]:
+        entry = self._entries.get(key)
+
+        if entry is not None and self.ttl and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: int, body: bytes, read_at: float, replica: bool = False) -> CachedEntity:
+        """
+        Cache a body whose read started at `read_at` (a monotonic() time).
+
+        If the entity was invalidated since, the body may predate that
+        change, so it is returned without being cached. The same goes for
+        bodies read from a replica within READ_YOUR_WRITES_SECONDS of an
+        invalidation, since the replica may not have applied that change yet,
+        and for reads older than the tombstones still kept.
+        """
+        now = time.monotonic()
+        entry = CachedEntity(body, now + self.ttl)
+        if not self.enabled or read_at <= self._pruned_until:
+            return entry
+
+        invalidated_at = self._tombstones.get(key)
+        if invalidated_at is not None:
+            if invalidated_at >= read_at:
+                return entry
+            if replica and now - invalidated_at < READ_YOUR_WRITES_SECONDS:
+                return entry
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        """Drop every entry, e.g. when the tables were recreated."""
+        self._entries.clear()
+
+    def invalidate(self, key: int):
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._tombstones[key] = now
+        self._tombstones.move_to_end(key)
+
+        while self._tombstones:
+            oldest_key, invalidated_at = next(iter(self._tombstones.items()))
+            if now - invalidated_at < self.tombstone_seconds:
+                break
+            del self._tombstones[oldest_key]
+            self._pruned_until = invalidated_at
+
+
+file_cache = EntityCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS, ENTITY_CACHE_ENABLED)
+user_cache = EntityCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS, ENTITY_CACHE_ENABLED)
+group_cache = EntityCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS, ENTITY_CACHE_ENABLED)
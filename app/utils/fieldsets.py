@@ -0,0 +1,58 @@
+from typing import Collection, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+
+def parse_fieldset(model: Type[BaseModel], relationships: Collection[str],
+                   fields: Optional[str], include: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Resolve the `fields` and `include` query parameters into the response fields to return.
+
+    `fields` lists the fields explicitly. `include` lists the relationships to
+    add; without `fields`, every plain field is returned along with them, so
+    `include=` alone drops all relationships.
+
+    Args:
+        model (Type[BaseModel]): The full response schema.
+        relationships (Collection[str]): The fields of `model` that are loaded from other tables.
+        fields (str, optional): Comma separated field names.
+        include (str, optional): Comma separated relationship names.
+
+    Returns:
+        Optional[Tuple[str, ...]]: The selected fields in schema order, or None
+        if the full response was requested.
+
+    Raises:
+        HTTPException: If a name is unknown or nothing is selected.
+    """
+    if fields is None and include is None:
+        return None
+
+    names = tuple(model.model_fields)
+    selected: Set[str] = set()
+
+    if fields is not None:
+        selected |= _split(fields, names, "fields")
+
+    if include is not None:
+        selected |= _split(include, relationships, "include")
+        if fields is None:
+            selected |= {name for name in names if name not in relationships}
+
+    if not selected:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields selected")
+
+    fieldset = tuple(name for name in names if name in selected)
+    return None if fieldset == names else fieldset
+
+
+def _split(value: str, allowed: Collection[str], parameter: str) -> Set[str]:
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Unknown {parameter}: {', '.join(sorted(unknown))}. "
+                                   f"Allowed: {', '.join(allowed)}")
+    return requested
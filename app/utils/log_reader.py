@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import re
+import zlib
+from collections import deque
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Pattern, Tuple
+
+BLOCK_SIZE = 64 * 1024
+
+_TEXT_HEADER = re.compile(rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}),\d{3} - \S+ - ([A-Z]+) - ")
+
+
+def log_files(log_file: str) -> List[str]:
+    """
+    Return the current log file and its rotated backups, oldest first.
+
+    RotatingFileHandler renames app.log to app.log.1, app.log.1 to app.log.2
+    and so on, so the highest suffix holds the oldest records.
+    """
+    directory, name = os.path.split(log_file)
+    backups = []
+    for entry in os.listdir(directory or "."):
+        suffix = entry[len(name) + 1:]
+        if entry.startswith(name + ".") and suffix.isdigit():
+            backups.append((int(suffix), os.path.join(directory, entry)))
+
+    files = [path for _, path in sorted(backups, reverse=True)]
+    if os.path.exists(log_file):
+        files.append(log_file)
+    return files
+
+
+def tail(files: List[str], lines: int) -> List[bytes]:
+    """
+    Return the last `lines` lines across `files` (oldest first), reading backwards.
+
+    Only the blocks holding those lines are read, so the cost depends on N
+    rather than on the size of the log.
+    """
+    collected: List[bytes] = []
+    for path in reversed(files):
+        missing = lines - len(collected)
+        if missing <= 0:
+            break
+        collected = _tail_file(path, missing) + collected
+    return collected
+
+
+def _tail_file(path: str, lines: int) -> List[bytes]:
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+
+        while position > 0 and data.count(b"\n") <= lines:
+            size = min(BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+
+    found = data.splitlines(keepends=True)
+    if position > 0:
+        # The first line started before the block that was read.
+        found = found[1:]
+    return found[-lines:]
+
+
+def read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes start..end (inclusive) of a file in BLOCK_SIZE chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(BLOCK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range against a file of `size` bytes.
+
+    Returns:
+        Optional[Tuple[int, int]]: The inclusive (start, end) offsets, or None
+        if the header is not a single byte range and should be ignored.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise ValueError(f"Range not satisfiable for {size} bytes")
+    return start, end
+
+
+class LogFilter:
+    """
+    Matches log records by pattern, minimum level and time window.
+
+    Lines that do not start a record (traceback lines, for instance) follow
+    the decision taken for the record they belong to. Both the text and the
+    JSON line formats are understood.
+    """
+
+    def __init__(self, pattern: Optional[Pattern[bytes]] = None, level: Optional[int] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.pattern = pattern
+        self.level = level
+        self.since = _local_naive(since) if since is not None else None
+        self.until = _local_naive(until) if until is not None else None
+
+    def lines(self, files: Iterable[str]) -> Iterator[bytes]:
+        """Yield the matching lines of `files` in order, one file and one line at a time."""
+        for path in files:
+            if self.since is not None and datetime.fromtimestamp(os.path.getmtime(path)) < self.since:
+                # Nothing in this file was written after `since`.
+                continue
+
+            keep = False
+            with open(path, "rb") as f:
+                for line in f:
+                    header = _parse_header(line)
+
+                    if header is not None:
+                        created, level = header
+                        if self.until is not None and created is not None and created > self.until:
+                            # Files are read oldest first, so no later record can match.
+                            return
+                        keep = self._matches(line, created, level)
+
+                    if keep:
+                        yield line
+
+    def _matches(self, line: bytes, created: Optional[datetime], level: Optional[int]) -> bool:
+        if self.level is not None and (level is None or level < self.level):
+            return False
+        if self.since is not None and (created is None or created < self.since):
+            return False
+        return self.pattern is None or bool(self.pattern.search(line))
+
+
+def _parse_header(line: bytes) -> Optional[Tuple[Optional[datetime], Optional[int]]]:
+    match = _TEXT_HEADER.match(line)
+    if match is not None:
+        return (datetime.strptime(match.group(1).decode(), "%Y-%m-%d %H:%M:%S"),
+                logging.getLevelName(match.group(2).decode()))
+
+    if line.startswith(b"{"):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None
+
+        created = record.get("time")
+        level = logging.getLevelName(record.get("level", ""))
+        return (_local_naive(datetime.fromisoformat(created)) if created else None,
+                level if isinstance(level, int) else None)
+
+    return None
+
+
+def _local_naive(moment: datetime) -> datetime:
+    # Text records carry naive local times; compare everything on that scale.
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo is not None else moment
+
+
+def last_lines(lines: Iterable[bytes], count: int) -> List[bytes]:
+    return list(deque(lines, maxlen=count))
+
+
+def batched(lines: Iterable[bytes], size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Join lines into chunks of about `size` bytes so each write carries many lines."""
+    buffer, buffered = [], 0
+    for line in lines:
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer, buffered = [], 0
+
+    if buffer:
+        yield b"".join(buffer)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress a stream of chunks into a single gzip member as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
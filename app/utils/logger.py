@@ -1,27 +1,174 @@
+import atexit
+import json
 import logging
 import os
+import pickle
+import queue
+import socketserver
+import struct
+import threading
+from collections.abc import Mapping
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+from fractions import Fraction
+from typing import Iterable
+from uuid import UUID
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, SocketHandler
 
-from logging.handlers import RotatingFileHandler
+from app.config.config import LOG_BACKUP_COUNT, LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_MAX_BYTES, LOG_SOCKET
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through `extra`.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, including `extra` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues records untouched.
+
+    The stock prepare() formats the message on the calling thread; here the
+    writer thread does it, so a request only pays for a queue put. Records
+    whose arguments could still change before then (lists, dicts, arbitrary
+    objects) are formatted right away instead, with the usual getMessage()
+    semantics, so the line shows their state at the time of the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args and not all(isinstance(arg, _IMMUTABLE_TYPES) for arg in _record_args(record)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, Decimal, Fraction, type(None),
+                    date, time, timedelta, timezone, UUID, Enum)
+
+
+def _record_args(record: logging.LogRecord) -> Iterable:
+    # A single mapping argument is used for %(name)s style formatting.
+    return record.args.values() if isinstance(record.args, Mapping) else record.args
+
+
+def file_handler() -> logging.Handler:
+    """
+    Create the rotating LOG_FILE handler.
+
+    Only one process may own it: rotation renames the file, which other
+    processes still writing to it would not notice.
+
+    Returns:
+        logging.Handler: The handler, formatting per LOG_FORMAT.
+    """
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+
+    handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+class _LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    """Reads the length-prefixed pickled records one SocketHandler sends."""
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+
+            data = self.rfile.read(struct.unpack(">L", header)[0])
+            self.server.handler.handle(logging.makeLogRecord(pickle.loads(data)))
+
+
+class LogReceiver(socketserver.ThreadingUnixStreamServer):
+    """
+    Writes the records of every worker process to a single handler.
+
+    The launcher runs it on a Unix socket in a private directory and points
+    the workers at it through LOG_SOCKET, so one process owns the log file
+    and rotates it.
+
+    Args:
+        path (str): Path of the Unix socket to listen on.
+        handler (logging.Handler): The handler to write the records to.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, handler: logging.Handler):
+        super().__init__(path, _LogRecordStreamHandler)
+        self.handler = handler
+
+    def start(self):
+        """Serve the workers on a background thread."""
+        threading.Thread(target=self.serve_forever, name="log-receiver", daemon=True).start()
+
+    def stop(self):
+        """Stop serving, then close the socket and the handler."""
+        self.shutdown()
+        self.server_close()
+        self.handler.close()
 
 
 def setup_logging():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    """
+    Route every log record through a queue to a background writer thread.
 
-    logs_dir = os.path.join(current_dir, '..', '..', 'logs')
+    The root logger only gets a QueueHandler; the rotating file handler, and
+    with it formatting and disk I/O, lives on a QueueListener thread. Under
+    the launcher the thread sends the records to its LogReceiver on
+    LOG_SOCKET instead, so only one process writes the file.
 
-    log_file = os.path.join(logs_dir, 'app.log')
+    Returns:
+        logging.Logger: The application logger.
+    """
+    global _listener
 
-    os.makedirs(logs_dir, exist_ok=True)
+    if _listener is None:
+        handler = SocketHandler(LOG_SOCKET, None) if LOG_SOCKET else file_handler()
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=5)
-        ]
-    )
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+        logging.basicConfig(level=LOG_LEVEL, handlers=[_DeferredQueueHandler(log_queue)], force=True)
 
     logger = logging.getLogger('my_app')
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
 
     return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
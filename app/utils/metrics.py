@@ -0,0 +1,115 @@
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "total", "count")
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class RequestMetrics:
+    """Per-route request counters and latency histograms for one worker process."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._responses: Dict[Tuple[str, str, int], int] = {}
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float):
+        histogram = self._latency.get((method, route))
+        if histogram is None:
+            histogram = self._latency[(method, route)] = _Histogram()
+        histogram.observe(seconds)
+
+        key = (method, route, status_code)
+        self._responses[key] = self._responses.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Completed requests by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status_code), count in sorted(self._responses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=str(status_code))} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self._latency.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+                cumulative += count
+                lines.append(f"http_request_duration_seconds_bucket"
+                             f"{_labels(method=method, route=route, le=str(bound))} {cumulative}")
+            lines.append(f"http_request_duration_seconds_bucket"
+                         f"{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram.total}")
+            lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware feeding request_metrics.
+
+    Routes are labelled with their path template (e.g. /files/GetFileByID/{file_id}),
+    which FastAPI stores in the scope once the request is matched, so label
+    cardinality stays bounded by the number of routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+
+        finally:
+            request_metrics.in_flight -= 1
+            route = scope.get("route")
+            request_metrics.observe(scope["method"], route.path if route is not None else "unmatched",
+                                    status_code, time.perf_counter() - started)
@@ -0,0 +1,48 @@
+from collections import deque
+from typing import Deque
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Connection checkout wait times, recorded by get_db for every session."""
+
+    def __init__(self, recent_size: int = 1024):
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._recent: Deque[float] = deque(maxlen=recent_size)
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        self._recent.append(seconds)
+
+    def record_timeout(self):
+        self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        recent = sorted(self._recent)
+
+        def percentile(fraction: float) -> float:
+            return recent[min(int(fraction * len(recent)), len(recent) - 1)] if recent else 0.0
+
+        # Only queue pools keep connections around; other pool classes report None.
+        is_queue_pool = isinstance(pool, QueuePool)
+
+        return {
+            "pool_class": type(pool).__name__,
+            "pool_size": pool.size() if is_queue_pool else None,
+            "checked_out": pool.checkedout() if is_queue_pool else None,
+            "idle": pool.checkedin() if is_queue_pool else None,
+            "overflow": max(pool.overflow(), 0) if is_queue_pool else None,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "wait_seconds_avg": self.wait_seconds_total / self.waits if self.waits else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "wait_seconds_p50": percentile(0.50),
+            "wait_seconds_p95": percentile(0.95),
+            "wait_seconds_p99": percentile(0.99),
+        }
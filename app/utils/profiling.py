@@ -0,0 +1,124 @@
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config.config import SLOW_QUERY_LOG_SIZE, SLOW_QUERY_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 2000
+
+
+class QueryStats:
+    __slots__ = ("_scope", "queries", "seconds")
+
+    def __init__(self, scope: dict):
+        self._scope = scope
+        self.queries = 0
+        self.seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        route = self._scope.get("route")
+        return route.path if route is not None else self._scope["path"]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+slow_queries: Deque[dict] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so a single start time will do.
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn, statement, executemany)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a statement that raises; account
+    # for it here so its time is counted and its start time does not linger.
+    if exception_context.connection is not None and exception_context.statement is not None:
+        context = exception_context.execution_context
+        _record_query(exception_context.connection, exception_context.statement,
+                      context.executemany if context is not None else False)
+
+
+def _record_query(conn, statement, executemany):
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        return
+
+    seconds = time.perf_counter() - started
+    stats = current_query_stats.get()
+
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += seconds
+
+    if seconds * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        slow_queries.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "route": stats.route if stats is not None else None,
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement[:MAX_STATEMENT_LENGTH],
+            "executemany": executemany,
+        })
+
+
+def register_query_hooks(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def get_slow_queries() -> List[dict]:
+    return list(reversed(slow_queries))
+
+
+class SQLProfilingMiddleware:
+    """
+    Plain ASGI middleware counting the SQL statements and database time of each request.
+
+    The totals are sent in a Server-Timing header and logged with the request.
+    SQLAlchemy runs its engine events in a greenlet that shares the request's
+    context, so the hooks above find the request's QueryStats through a ContextVar.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                server_timing = (f'db;dur={stats.seconds * 1000:.3f};desc="{stats.queries} queries", '
+                                 f'app;dur={(time.perf_counter() - started) * 1000:.3f}')
+                message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+
+        finally:
+            current_query_stats.reset(token)
+            logger.info("%s %s - %d queries, %.3f ms in database, %.3f ms total",
+                        scope["method"], stats.route, stats.queries, stats.seconds * 1000,
+                        (time.perf_counter() - started) * 1000,
+                        extra={"route": stats.route, "db_queries": stats.queries,
+                               "db_ms": round(stats.seconds * 1000, 3)})
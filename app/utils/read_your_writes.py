@@ -0,0 +1,52 @@
+import time
+from http.cookies import SimpleCookie
+from typing import Optional
+
+from fastapi import Request
+
+from app.config.config import READ_YOUR_WRITES_SECONDS
+
+PRIMARY_COOKIE = "db_primary_until"
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def reads_from_primary(request: Optional[Request]) -> bool:
+    """Whether the client wrote recently enough that a replica may not have its changes yet."""
+    if request is None:
+        return False
+
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    Plain ASGI middleware pinning a client's reads to the primary after it writes.
+
+    Every successful non-read request sets a cookie holding the time until
+    which that client's reads skip the replica, so a client always sees its own
+    writes even while the replica lags behind.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PRIMARY_COOKIE] = f"{time.time() + READ_YOUR_WRITES_SECONDS:.3f}"
+                cookie[PRIMARY_COOKIE].update({"max-age": str(int(READ_YOUR_WRITES_SECONDS) + 1),
+                                               "path": "/", "httponly": True, "samesite": "Lax"})
+                message["headers"] = [*message.get("headers", []),
+                                      (b"set-cookie", cookie.output(header="").strip().encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
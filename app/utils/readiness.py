@@ -0,0 +1,23 @@
+from typing import Optional
+
+
+class Readiness:
+    """Startup progress of this worker, as reported by /ready."""
+
+    def __init__(self):
+        self.database = False
+        self.schema: Optional[str] = None
+        self.pool_warmed = 0
+        self.pool_target = 0
+        self.ready = False
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "READY" if self.ready else "NOT_READY",
+            "database": self.database,
+            "schema": self.schema or "pending",
+            "pool": {"warmed": self.pool_warmed, "target": self.pool_target},
+        }
+
+
+readiness = Readiness()
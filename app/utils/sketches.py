@@ -0,0 +1,237 @@
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_MASK_64 = (1 << 64) - 1
+
+
+def _hash64(value: int) -> int:
+    # splitmix64 finalizer: cheap and well distributed for sequential ids.
+    z = (value + 0x9E3779B97F4A7C15) & _MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return z ^ (z >> 31)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over integer ids.
+
+    Small sets are kept exactly and only switch to 2^precision registers once
+    they outgrow a sixteenth of the register count. The harmonic sum and the
+    number of empty registers are maintained on every update, so estimate()
+    is O(1).
+    """
+
+    def __init__(self, precision: int):
+        self.precision = precision
+        self.m = 1 << precision
+        self._sparse_limit = self.m // 16
+        self._items: Optional[Set[int]] = set()
+        self._registers: Optional[bytearray] = None
+        self._inverse_sum = 0.0
+        self._zeros = 0
+
+    @property
+    def is_exact(self) -> bool:
+        return self._items is not None
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: int) -> bool:
+        """Add an id, returning True if the estimate may have changed."""
+        if self._items is not None:
+            if value in self._items:
+                return False
+
+            self._items.add(value)
+            if len(self._items) > self._sparse_limit:
+                self._densify()
+            return True
+
+        return self._add_hash(_hash64(value))
+
+    def update(self, other: "HyperLogLog") -> bool:
+        """Merge another sketch of the same precision into this one."""
+        if other._items is not None:
+            changed = False
+            for value in other._items:
+                changed = self.add(value) or changed
+            return changed
+
+        if self._items is not None:
+            self._densify()
+
+        changed = False
+        registers = self._registers
+        for index, rank in enumerate(other._registers):
+            if rank > registers[index]:
+                registers[index] = rank
+                changed = True
+
+        if changed:
+            self._recount()
+        return changed
+
+    def estimate(self) -> int:
+        if self._items is not None:
+            return len(self._items)
+
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / self._inverse_sum
+
+        if raw <= 2.5 * m and self._zeros:
+            return round(m * math.log(m / self._zeros))
+        return round(raw)
+
+    def _add_hash(self, hashed: int) -> bool:
+        index = hashed >> (64 - self.precision)
+        remaining = (hashed << self.precision) & _MASK_64
+        rank = min(64 - remaining.bit_length(), 64 - self.precision) + 1
+
+        current = self._registers[index]
+        if rank <= current:
+            return False
+
+        self._registers[index] = rank
+        self._inverse_sum += 2.0 ** -rank - 2.0 ** -current
+        if current == 0:
+            self._zeros -= 1
+        return True
+
+    def _densify(self):
+        items = self._items
+        self._items = None
+        self._registers = bytearray(self.m)
+        self._inverse_sum = float(self.m)
+        self._zeros = self.m
+
+        for value in items:
+            self._add_hash(_hash64(value))
+
+    def _recount(self):
+        self._inverse_sum = sum(2.0 ** -rank for rank in self._registers)
+        self._zeros = self._registers.count(0)
+
+
+class HeavyHitters:
+    """
+    Bounded table of the files with the largest estimated audience.
+
+    A file enters the table while there is room, or by evicting the current
+    minimum when its estimate is larger. top(k) only looks at the table, so
+    its cost depends on the capacity rather than on the number of files.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._counts: Dict[int, int] = {}
+        self._min_key: Optional[int] = None
+
+    def offer(self, key: int, count: int):
+        counts = self._counts
+
+        if key in counts:
+            # The minimum can move if it grew, or if another key dropped below it.
+            if key == self._min_key or count < counts[key]:
+                self._min_key = None
+            counts[key] = count
+            return
+
+        if len(counts) < self.capacity:
+            counts[key] = count
+            if self._min_key is not None and count < counts[self._min_key]:
+                self._min_key = key
+            return
+
+        if self._min_key is None:
+            self._min_key = min(counts, key=counts.__getitem__)
+
+        if count > counts[self._min_key]:
+            del counts[self._min_key]
+            counts[key] = count
+            self._min_key = None
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        ranked = sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+
+class ShareSketches:
+    """
+    Approximate effective audience per file.
+
+    Every file and group has a HyperLogLog of user ids. Sharing a file with a
+    group merges the group sketch into the file sketch, and adding a user to a
+    group adds them to the sketch of every file the group can see.
+    """
+
+    def __init__(self, precision: int, heavy_hitters_capacity: int):
+        self.precision = precision
+        self._heavy_hitters_capacity = heavy_hitters_capacity
+        self.clear()
+
+    def clear(self):
+        self._file_sketches: Dict[int, HyperLogLog] = {}
+        self._group_sketches: Dict[int, HyperLogLog] = {}
+        self._group_files: Dict[int, Set[int]] = {}
+        self._heavy_hitters = HeavyHitters(self._heavy_hitters_capacity)
+        self.ready = False
+
+    def replace(self, other: "ShareSketches"):
+        self._file_sketches = other._file_sketches
+        self._group_sketches = other._group_sketches
+        self._group_files = other._group_files
+        self._heavy_hitters = other._heavy_hitters
+        self.ready = True
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def add_file_users(self, file_id: int, user_ids: Iterable[int]):
+        sketch = self._file_sketch(file_id)
+        changed = False
+        for user_id in user_ids:
+            changed = sketch.add(user_id) or changed
+
+        if changed:
+            self._heavy_hitters.offer(file_id, sketch.estimate())
+
+    def add_file_groups(self, file_id: int, group_ids: Iterable[int]):
+        sketch = self._file_sketch(file_id)
+        changed = False
+        for group_id in group_ids:
+            self._group_files.setdefault(group_id, set()).add(file_id)
+            group_sketch = self._group_sketches.get(group_id)
+            if group_sketch is not None:
+                changed = sketch.update(group_sketch) or changed
+
+        if changed:
+            self._heavy_hitters.offer(file_id, sketch.estimate())
+
+    def add_group_users(self, group_id: int, user_ids: Iterable[int]):
+        user_ids = list(user_ids)
+        group_sketch = self._group_sketches.setdefault(group_id, HyperLogLog(self.precision))
+        for user_id in user_ids:
+            group_sketch.add(user_id)
+
+        for file_id in self._group_files.get(group_id, ()):
+            self.add_file_users(file_id, user_ids)
+
+    def top(self, k: int) -> List[Tuple[int, int, int]]:
+        """Return (file_id, estimated users, error bound) for the top k files."""
+        top_files = []
+        for file_id, estimate in self._heavy_hitters.top(k):
+            sketch = self._file_sketches[file_id]
+            error_bound = 0 if sketch.is_exact else math.ceil(2 * sketch.relative_error * estimate)
+            top_files.append((file_id, estimate, error_bound))
+        return top_files
+
+    def _file_sketch(self, file_id: int) -> HyperLogLog:
+        sketch = self._file_sketches.get(file_id)
+        if sketch is None:
+            sketch = self._file_sketches[file_id] = HyperLogLog(self.precision)
+        return sketch
@@ -0,0 +1 @@
+"""Synthetic data seeding and load generation for measuring the API."""
@@ -0,0 +1,62 @@
+"""
+Compare two benchmarks.load reports scenario by scenario.
+
+Usage:
+    python -m benchmarks.compare baseline.json results.json [--threshold 10]
+
+Exits with status 1 if any scenario's p95 latency grew, or its throughput
+dropped, by more than the threshold percentage.
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    regressed = False
+    print(f"{'scenario':<28}{'p95 ms':>20}{'req/s':>22}{'queries/req':>18}")
+
+    for name, after in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+
+        p95 = change(before["latency_ms"]["p95"], after["latency_ms"]["p95"])
+        throughput = change(before["throughput_rps"], after["throughput_rps"])
+        flag = ((p95 is not None and p95 > threshold) or
+                (throughput is not None and throughput < -threshold))
+        regressed = regressed or flag
+
+        print(f"{name:<28}"
+              f"{before['latency_ms']['p95']:>9} -> {after['latency_ms']['p95']:<8}"
+              f"{before['throughput_rps']:>10} -> {after['throughput_rps']:<10}"
+              f"{str(before['queries_per_request']):>7} -> {str(after['queries_per_request']):<8}"
+              f"{'  REGRESSION' if flag else ''}")
+
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10, help="Allowed change in percent.")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Drive every router with concurrent clients and report latency, throughput and
+queries per request as JSON.
+
+Each scenario is one route. It runs for --duration seconds with --concurrency
+clients over keep-alive connections. IDs are drawn from the ranges in the
+seed manifest, skewed towards low ids so that some entities are hot.
+Queries per request come from the Server-Timing header that
+SQLProfilingMiddleware adds to every response.
+
+Usage:
+    python -m benchmarks.load --base-url http://localhost:8000 --output results.json
+    python -m benchmarks.compare baseline.json results.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+
+_DB_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Request(NamedTuple):
+    method: str
+    url: str
+    params: Optional[dict] = None
+    json: Optional[object] = None
+    content: Optional[bytes] = None
+    headers: Optional[dict] = None
+
+
+class Scenario(NamedTuple):
+    name: str
+    router: str
+    build: Callable[["IdSampler"], Request]
+
+
+class IdSampler:
+    """Random ids within the seeded ranges, biased towards the popular (low) ids."""
+
+    def __init__(self, manifest: dict, seed: int, skew: float):
+        self.users = manifest["users"]
+        self.groups = manifest["groups"]
+        self.files = manifest["files"]
+        self._rng = random.Random(seed)
+        self._skew = skew
+
+    def pick(self, count: int) -> int:
+        return min(int(count * self._rng.random() ** self._skew) + 1, count)
+
+    def user(self) -> int:
+        return self.pick(self.users)
+
+    def group(self) -> int:
+        return self.pick(self.groups)
+
+    def file(self) -> int:
+        return self.pick(self.files)
+
+    def many(self, pick: Callable[[], int], size: int) -> List[int]:
+        return [pick() for _ in range(size)]
+
+    def name(self) -> str:
+        return f"bench{self._rng.randrange(10 ** 9)}"
+
+    def risk(self) -> int:
+        return self._rng.randint(0, 100)
+
+
+def _ndjson(records: List[dict]) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+SCENARIOS = [
+    Scenario("CreateFile", "files", lambda s: Request("POST", "/files/CreateFile/",
+                                                      json={"name": s.name(), "risk": s.risk()})),
+    Scenario("BulkCreateFiles", "files", lambda s: Request("POST", "/files/BulkCreateFiles/", headers=NDJSON,
+                                                           content=_ndjson([{"name": s.name(), "risk": s.risk()}
+                                                                            for _ in range(100)]))),
+    Scenario("GetAllFiles", "files", lambda s: Request("GET", "/files/GetAllFiles/",
+                                                       params={"after_id": s.file(), "limit": 100})),
+    Scenario("GetAllFilesFast", "files", lambda s: Request("GET", "/files/GetAllFiles/",
+                                                           params={"after_id": s.file(), "limit": 100, "fast": "true"})),
+    Scenario("GetAllFilesSparse", "files", lambda s: Request("GET", "/files/GetAllFiles/",
+                                                             params={"after_id": s.file(), "limit": 100,
+                                                                     "fields": "name,risk"})),
+    Scenario("GetAllFilesByRisk", "files", lambda s: Request("GET", "/files/GetAllFiles/",
+                                                             params={"min_risk": 50, "sort": "-risk", "limit": 100})),
+    Scenario("RiskHistogram", "files", lambda s: Request("GET", "/files/RiskHistogram")),
+    Scenario("GetFileByID", "files", lambda s: Request("GET", f"/files/GetFileByID/{s.file()}")),
+    Scenario("ShareFileWithUser", "files", lambda s: Request("POST", "/files/ShareFileWithUser/",
+                                                             params={"file_id": s.file(), "user_id": s.user()})),
+    Scenario("ShareFileWithGroup", "files", lambda s: Request("POST", "/files/ShareFileWithGroup/",
+                                                              params={"file_id": s.file(), "group_id": s.group()})),
+    Scenario("ShareFileWithUsers", "files", lambda s: Request("POST", "/files/ShareFileWithUsers/",
+                                                              json={"file_id": s.file(),
+                                                                    "user_ids": s.many(s.user, 100)})),
+    Scenario("ShareFileWithGroups", "files", lambda s: Request("POST", "/files/ShareFileWithGroups/",
+                                                               json={"file_id": s.file(),
+                                                                     "group_ids": s.many(s.group, 10)})),
+    Scenario("TopSharedFiles", "files", lambda s: Request("GET", "/files/TopSharedFiles/10")),
+    Scenario("TopSharedFilesApproximate", "files", lambda s: Request("GET", "/files/TopSharedFiles/10",
+                                                                     params={"approximate": "true"})),
+    Scenario("TopExposed", "files", lambda s: Request("GET", "/files/TopExposed/100", params={"min_risk": 50})),
+    Scenario("CanAccess", "files", lambda s: Request("GET", f"/files/{s.file()}/CanAccess/{s.user()}")),
+    Scenario("CanAccessBatch", "files", lambda s: Request("POST", "/files/CanAccess/",
+                                                          json={"checks": [{"file_id": s.file(), "user_id": s.user()}
+                                                                           for _ in range(100)]})),
+    Scenario("CreateUser", "users", lambda s: Request("POST", "/users/CreateUser/", json={"name": s.name()})),
+    Scenario("BulkCreateUsers", "users", lambda s: Request("POST", "/users/BulkCreateUsers/", headers=NDJSON,
+                                                           content=_ndjson([{"name": s.name()} for _ in range(100)]))),
+    Scenario("GetAllUsers", "users", lambda s: Request("GET", "/users/GetAllUsers/",
+                                                       params={"after_id": s.user(), "limit": 100})),
+    Scenario("GetAllUsersFast", "users", lambda s: Request("GET", "/users/GetAllUsers/",
+                                                           params={"after_id": s.user(), "limit": 100, "fast": "true"})),
+    Scenario("GetUserByID", "users", lambda s: Request("GET", f"/users/GetUserByID/{s.user()}")),
+    Scenario("AccessibleFiles", "users", lambda s: Request("GET", f"/users/{s.user()}/AccessibleFiles",
+                                                           params={"limit": 100})),
+    Scenario("CreateGroup", "groups", lambda s: Request("POST", "/groups/CreateGroup/", json={"name": s.name()})),
+    Scenario("BulkCreateGroups", "groups", lambda s: Request("POST", "/groups/BulkCreateGroups/", headers=NDJSON,
+                                                             content=_ndjson([{"name": s.name()}
+                                                                              for _ in range(100)]))),
+    Scenario("GetAllGroups", "groups", lambda s: Request("GET", "/groups/GetAllGroups/",
+                                                         params={"after_id": s.group(), "limit": 100})),
+    Scenario("GetAllGroupsFast", "groups", lambda s: Request("GET", "/groups/GetAllGroups/",
+                                                             params={"after_id": s.group(), "limit": 100,
+                                                                     "fast": "true"})),
+    Scenario("GetGroupByID", "groups", lambda s: Request("GET", f"/groups/GetGroupByID/{s.group()}")),
+    Scenario("ShareGroupWithUser", "groups", lambda s: Request("POST", "/groups/ShareGroupWithUser/",
+                                                               params={"group_id": s.group(), "user_id": s.user()})),
+    Scenario("ShareGroupWithUsers", "groups", lambda s: Request("POST", "/groups/ShareGroupWithUsers/",
+                                                                json={"group_id": s.group(),
+                                                                      "user_ids": s.many(s.user, 100)})),
+    Scenario("PoolStats", "admin", lambda s: Request("GET", "/admin/PoolStats")),
+    Scenario("SlowQueries", "admin", lambda s: Request("GET", "/admin/SlowQueries")),
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, sampler: IdSampler,
+                       concurrency: int, duration: float) -> dict:
+    latencies: List[float] = []
+    queries: List[int] = []
+    db_ms: List[float] = []
+    statuses: Dict[str, int] = {}
+    failures = 0
+
+    async def worker(deadline: float):
+        nonlocal failures
+        while time.perf_counter() < deadline:
+            request = scenario.build(sampler)
+            started = time.perf_counter()
+            try:
+                response = await client.request(request.method, request.url, params=request.params,
+                                                json=request.json, content=request.content,
+                                                headers=request.headers)
+            except httpx.HTTPError:
+                failures += 1
+                continue
+
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+            timing = _DB_TIMING.search(response.headers.get("server-timing", ""))
+            if timing is not None:
+                db_ms.append(float(timing.group(1)))
+                queries.append(int(timing.group(2)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(started + duration) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "router": scenario.router,
+        "requests": len(latencies),
+        "failures": failures,
+        "server_errors": sum(count for code, count in statuses.items() if code.startswith("5")),
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "queries_per_request": round(sum(queries) / len(queries), 3) if queries else None,
+        "db_ms_per_request": round(sum(db_ms) / len(db_ms), 3) if db_ms else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    sampler = IdSampler(manifest, args.seed, args.skew)
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    results = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        for scenario in SCENARIOS:
+            if selected is not None and scenario.name not in selected and scenario.router not in selected:
+                continue
+            if args.read_only and scenario.build(sampler).method != "GET":
+                continue
+
+            results[scenario.name] = await run_scenario(client, scenario, sampler, args.concurrency, args.duration)
+            print(f"{scenario.name}: {results[scenario.name]['throughput_rps']} req/s, "
+                  f"p99 {results[scenario.name]['latency_ms']['p99']} ms", file=sys.stderr)
+
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "seed": args.seed,
+        "graph": manifest,
+        "scenarios": results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every router against a seeded database.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default="benchmarks/seed.json", help="Written by benchmarks.seed.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--skew", type=float, default=2.0,
+                        help="Bias towards low ids: 1 is uniform, larger values hit popular ids more.")
+    parser.add_argument("--scenarios", help="Comma separated scenario or router names (default: all).")
+    parser.add_argument("--read-only", action="store_true", help="Skip scenarios that write.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
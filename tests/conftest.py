@@ -0,0 +1,109 @@
+import os
+import tempfile
+
+# The application reads its configuration when it is imported, so the test
+# database and log file are chosen here, before anything under app/ is.
+_scratch = tempfile.mkdtemp(prefix="file-management-tests-")
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_scratch, "test.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(_scratch, "app.log"))
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.config.config import DB_BACKEND
+from app.database.database import Base, engine
+from app.main import app
+from app.utils.entity_cache import file_cache, group_cache, user_cache
+
+# The engine is built once per process from DB_BACKEND, so each run covers one
+# backend and the tests for the other one are skipped.
+BACKENDS = ("sqlite", "postgres")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _drop_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+
+
+@pytest.fixture(params=BACKENDS)
+async def client(request):
+    """A client for the application, started on an empty schema and torn down after the test."""
+    if request.param != DB_BACKEND:
+        pytest.skip(f"run with DB_BACKEND={request.param}")
+
+    await _drop_tables()
+    # IDs restart on the new tables, so entries of earlier tests would be served for them.
+    for cache in (file_cache, group_cache, user_cache):
+        cache.clear()
+
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as test_client:
+            yield test_client
+
+        await _drop_tables()
+
+
+@pytest.fixture(params=BACKENDS)
+async def empty_database(request):
+    """An empty database for tests that create their own schema, dropped again after the test."""
+    if request.param != DB_BACKEND:
+        pytest.skip(f"run with DB_BACKEND={request.param}")
+
+    await _drop_tables()
+    yield
+    await _drop_tables()
+    # The pooled connections belong to this test's event loop.
+    await engine.dispose()
+
+
+class QueryCounter:
+    """Counts the statements sent to the database and the most parameters any of them bound."""
+
+    def __init__(self):
+        self.count = 0
+        self.max_parameters = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        if not executemany:
+            self.max_parameters = max(self.max_parameters, len(parameters or ()))
+
+    def reset(self):
+        self.count = 0
+        self.max_parameters = 0
+
+
+@pytest.fixture
+def queries():
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine.sync_engine, "before_cursor_execute", counter)
+
+
+class CheckoutCounter:
+    """Counts the connections checked out of the pool."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+@pytest.fixture
+def checkouts():
+    counter = CheckoutCounter()
+    event.listen(engine.sync_engine, "checkout", counter)
+    yield counter
+    event.remove(engine.sync_engine, "checkout", counter)
@@ -0,0 +1,40 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+# asyncpg binds at most 32767 arguments per statement, and stock SQLite 32766.
+MAX_BIND_PARAMETERS = 32766
+
+
+async def test_batch_confirms_denials_within_the_parameter_limit(client, queries):
+    user = (await client.post("/users/CreateUser/", json={"name": "user"})).json()
+    file_id = (await client.post("/files/BulkCreateFiles/", content='{"name": "file", "risk": 1}\n',
+                                 headers={"content-type": "application/x-ndjson"})).json()["ids"][0]
+    await client.post("/files/ShareFileWithUser/", params={"file_id": file_id, "user_id": user["id"]})
+
+    # The largest batch allowed, all denied but one, so every denial is confirmed against the database.
+    checks = [{"file_id": file_id, "user_id": user["id"] + i} for i in range(10000)]
+    queries.reset()
+    response = await client.post("/files/CanAccess/", json={"checks": checks})
+
+    assert response.status_code == 200
+    assert [result["allowed"] for result in response.json()] == [True] + [False] * 9999
+    assert 0 < queries.max_parameters <= MAX_BIND_PARAMETERS
+
+
+async def test_checks_answered_by_the_index_skip_the_pool(client, checkouts):
+    user = (await client.post("/users/CreateUser/", json={"name": "user"})).json()
+    file_id = (await client.post("/files/BulkCreateFiles/", content='{"name": "file", "risk": 1}\n',
+                                 headers={"content-type": "application/x-ndjson"})).json()["ids"][0]
+    await client.post("/files/ShareFileWithUser/", params={"file_id": file_id, "user_id": user["id"]})
+
+    checkouts.reset()
+    allowed = await client.get(f"/files/{file_id}/CanAccess/{user['id']}")
+    batch = await client.post("/files/CanAccess/", json={"checks": [{"file_id": file_id, "user_id": user["id"]}]})
+    answered_from_index = checkouts.count
+
+    denied = await client.get(f"/files/{file_id}/CanAccess/{user['id'] + 1}")
+
+    assert allowed.json()["allowed"] and batch.json()[0]["allowed"] and not denied.json()["allowed"]
+    assert answered_from_index == 0
+    assert checkouts.count == 1
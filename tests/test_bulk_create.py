@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+CSV = {"Content-Type": "text/csv"}
+
+
+async def test_ndjson_records_are_created_in_order(client):
+    body = "\n".join(json.dumps({"name": f"file{i}", "risk": i}) for i in range(1, 4)) + "\n"
+
+    response = await client.post("/files/BulkCreateFiles/", content=body, headers=NDJSON)
+
+    assert response.status_code == 200
+    ids = response.json()["ids"]
+    assert len(ids) == 3 and ids == sorted(ids)
+    files = (await client.get("/files/GetAllFiles/")).json()
+    assert [(file["name"], file["risk"]) for file in files] == [("file1", 1), ("file2", 2), ("file3", 3)]
+
+
+async def test_csv_records_are_created(client):
+    users = await client.post("/users/BulkCreateUsers/", content="name\nada\nbob\n", headers=CSV)
+    groups = await client.post("/groups/BulkCreateGroups/", content="name\nteam\n", headers=CSV)
+
+    assert len(users.json()["ids"]) == 2
+    assert len(groups.json()["ids"]) == 1
+    assert [user["name"] for user in (await client.get("/users/GetAllUsers/")).json()] == ["ada", "bob"]
+
+
+async def test_invalid_records_create_nothing(client):
+    body = '{"name": "ok", "risk": 1}\n{"name": "bad", "risk": 101}\n'
+
+    response = await client.post("/files/BulkCreateFiles/", content=body, headers=NDJSON)
+
+    assert response.status_code == 422
+    assert [error["line"] for error in response.json()["detail"]] == [2]
+    assert (await client.get("/files/GetAllFiles/")).json() == []
+
+
+async def test_bulk_files_update_the_risk_histogram(client):
+    await client.post("/files/BulkCreateFiles/", content="name,risk\na,5\nb,15\nc,15\n", headers=CSV)
+
+    histogram = (await client.get("/files/RiskHistogram", params={"bucket_size": 10})).json()
+
+    assert histogram["total"] == 3
+    assert [bucket["files"] for bucket in histogram["buckets"][:3]] == [1, 2, 0]
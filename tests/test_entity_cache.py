@@ -0,0 +1,113 @@
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from app.database.database import SessionLocal
+from app.models import File
+from app.utils.entity_cache import EntityCache
+from app.utils.read_your_writes import PRIMARY_COOKIE
+
+pytestmark = pytest.mark.anyio
+
+
+def test_invalidation_only_blocks_reads_of_the_same_key():
+    cache = EntityCache(10, 30)
+    read_at = time.monotonic()
+
+    cache.invalidate(2)
+    cache.put(1, b"{}", read_at)
+    cache.put(2, b"{}", read_at)
+
+    assert cache.get(1) is not None
+    assert cache.get(2) is None
+
+
+def test_reads_started_after_the_invalidation_are_cached():
+    cache = EntityCache(10, 30)
+    cache.invalidate(1)
+
+    cache.put(1, b"{}", time.monotonic())
+
+    assert cache.get(1) is not None
+
+
+def test_replica_reads_right_after_an_invalidation_are_not_cached():
+    cache = EntityCache(10, 30)
+    cache.invalidate(1)
+
+    cache.put(1, b"{}", time.monotonic(), replica=True)
+
+    assert cache.get(1) is None
+
+
+def test_reads_older_than_the_kept_tombstones_are_not_cached():
+    cache = EntityCache(10, 30, tombstone_seconds=0)
+    read_at = time.monotonic()
+
+    cache.invalidate(1)
+    cache.invalidate(2)
+    cache.put(1, b"{}", read_at)
+    cache.put(3, b"{}", read_at)
+
+    assert cache.get(1) is None
+    assert cache.get(3) is None
+    assert len(cache._tombstones) == 0
+
+
+async def test_clients_that_just_wrote_read_past_the_cache(client, checkouts):
+    async with SessionLocal() as db:
+        await db.execute(insert(File), [{"id": 1, "name": "file1", "risk": 1}])
+        await db.commit()
+
+    assert (await client.get("/files/GetFileByID/1")).status_code == 200
+    checkouts.reset()
+    assert (await client.get("/files/GetFileByID/1")).status_code == 200
+    assert checkouts.count == 0
+
+    client.cookies.set(PRIMARY_COOKIE, str(time.time() + 60))
+    try:
+        assert (await client.get("/files/GetFileByID/1")).status_code == 200
+    finally:
+        client.cookies.clear()
+    assert checkouts.count == 1
+
+
+async def test_matching_etag_answers_not_modified(client):
+    await client.post("/users/CreateUser/", json={"name": "ada"})
+    first = await client.get("/users/GetUserByID/1")
+
+    again = await client.get("/users/GetUserByID/1", headers={"If-None-Match": first.headers["ETag"]})
+    other = await client.get("/users/GetUserByID/1", headers={"If-None-Match": '"stale"'})
+
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert other.status_code == 200
+    assert other.json() == {"name": "ada", "id": 1}
+
+
+@pytest.mark.parametrize("route, share, params", [
+    ("/files/GetFileByID/1", "/files/ShareFileWithUser/", {"file_id": 1, "user_id": 1}),
+    ("/files/GetFileByID/1", "/files/ShareFileWithGroup/", {"file_id": 1, "group_id": 1}),
+    ("/groups/GetGroupByID/1", "/groups/ShareGroupWithUser/", {"group_id": 1, "user_id": 1}),
+])
+async def test_sharing_invalidates_the_cached_entity(client, route, share, params):
+    await client.post("/users/CreateUser/", json={"name": "ada"})
+    await client.post("/groups/CreateGroup/", json={"name": "team"})
+    await client.post("/files/CreateFile/", json={"name": "report", "risk": 1})
+    before = await client.get(route)
+
+    await client.post(share, params=params)
+    after = await client.get(route, headers={"If-None-Match": before.headers["ETag"]})
+
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.json() != before.json()
+
+
+async def test_missing_entities_are_not_cached(client):
+    assert (await client.get("/files/GetFileByID/1")).status_code == 404
+
+    await client.post("/files/CreateFile/", json={"name": "report", "risk": 1})
+
+    assert (await client.get("/files/GetFileByID/1")).status_code == 200
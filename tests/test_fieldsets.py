@@ -0,0 +1,52 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def shared_file(client):
+    await client.post("/users/CreateUser/", json={"name": "ada"})
+    await client.post("/groups/CreateGroup/", json={"name": "team"})
+    await client.post("/files/CreateFile/", json={"name": "report", "risk": 7})
+    await client.post("/files/ShareFileWithUser/", params={"file_id": 1, "user_id": 1})
+    await client.post("/files/ShareFileWithGroup/", params={"file_id": 1, "group_id": 1})
+    await client.post("/groups/ShareGroupWithUser/", params={"group_id": 1, "user_id": 1})
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"fields": "name,risk"}, {"name": "report", "risk": 7}),
+    ({"fields": "users"}, {"users": [{"id": 1}]}),
+    ({"include": ""}, {"name": "report", "risk": 7}),
+    ({"include": "groups"}, {"name": "report", "risk": 7, "groups": [{"id": 1}]}),
+])
+async def test_file_by_id_returns_the_selected_fields(client, shared_file, params, expected):
+    response = await client.get("/files/GetFileByID/1", params=params)
+
+    assert response.status_code == 200
+    assert response.json() == expected
+    assert response.headers["ETag"]
+
+
+async def test_partial_responses_match_the_cached_entity(client, shared_file):
+    await client.get("/files/GetFileByID/1")
+
+    cached = await client.get("/files/GetFileByID/1", params={"fields": "name,groups"})
+
+    assert cached.json() == {"name": "report", "groups": [{"id": 1}]}
+
+
+async def test_file_list_returns_the_selected_fields(client, shared_file):
+    response = await client.get("/files/GetAllFiles/", params={"fields": "name,users"})
+
+    assert response.json() == [{"name": "report", "users": [{"id": 1}]}]
+
+
+async def test_group_by_id_without_relationships(client, shared_file):
+    response = await client.get("/groups/GetGroupByID/1", params={"include": ""})
+
+    assert response.json() == {"name": "team"}
+
+
+@pytest.mark.parametrize("params", [{"fields": "owner"}, {"include": "name"}, {"fields": ""}])
+async def test_unknown_or_empty_fieldsets_are_rejected(client, shared_file, params):
+    assert (await client.get("/files/GetFileByID/1", params=params)).status_code == 400
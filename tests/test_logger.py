@@ -0,0 +1,57 @@
+import logging
+import queue
+import time
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler, SocketHandler
+
+from app.utils.logger import LogReceiver, _DeferredQueueHandler
+
+
+def _enqueue(msg, *args) -> logging.LogRecord:
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.emit(logging.makeLogRecord({"msg": msg, "args": args}))
+    return records.get_nowait()
+
+
+def test_immutable_arguments_are_left_for_the_writer_thread():
+    record = _enqueue("%s took %d ms (%.1f%%) - %r", "query", Decimal("12"), Decimal("2.55"), "x")
+
+    assert record.args == ("query", Decimal("12"), Decimal("2.55"), "x")
+    assert record.getMessage() == "query took 12 ms (2.5%) - 'x'"
+
+
+def test_mutable_arguments_are_formatted_when_logged():
+    ids = [1, 2]
+    record = _enqueue("shared with %r", ids)
+    ids.append(3)
+
+    assert record.args is None
+    assert record.getMessage() == "shared with [1, 2]"
+
+
+def test_receiver_writes_and_rotates_for_every_worker(tmp_path):
+    log_file = tmp_path / "app.log"
+    handler = RotatingFileHandler(log_file, maxBytes=200, backupCount=50)
+    handler.setFormatter(logging.Formatter("%(name)s %(message)s"))
+    receiver = LogReceiver(str(tmp_path / "log.sock"), handler)
+    receiver.start()
+
+    workers = [SocketHandler(receiver.server_address, None) for _ in range(2)]
+    try:
+        for i in range(20):
+            for worker, sender in enumerate(workers):
+                sender.handle(logging.makeLogRecord({"name": f"worker{worker}", "msg": "line %d", "args": (i,)}))
+    finally:
+        for sender in workers:
+            sender.close()
+
+    deadline = time.monotonic() + 5
+    lines = []
+    while len(lines) < 40 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        lines = [line for path in tmp_path.glob("app.log*") for line in path.read_text().splitlines()]
+    receiver.stop()
+
+    assert sorted(lines) == sorted(f"worker{w} line {i}" for w in range(2) for i in range(20))
+    assert (tmp_path / "app.log.1").exists()
@@ -0,0 +1,85 @@
+import gzip
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+RECORDS = [
+    "2024-05-01 10:00:00,000 - app - INFO - started\n",
+    "2024-05-01 10:05:00,000 - app - WARNING - slow query\n",
+    "2024-05-01 10:10:00,000 - app - ERROR - failed\n",
+    "Traceback (most recent call last):\n",
+    "2024-05-01 10:15:00,000 - app - INFO - stopped\n",
+]
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """A log with one rotated backup holding the first record."""
+    path = tmp_path / "app.log"
+    (tmp_path / "app.log.1").write_text(RECORDS[0])
+    path.write_text("".join(RECORDS[1:]))
+    monkeypatch.setattr("app.main.LOG_FILE", str(path))
+    return path
+
+
+async def test_without_parameters_the_current_file_is_returned(client, log_file):
+    # httpx asks for gzip by default.
+    response = await client.get("/logs", headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.text == log_file.read_text()
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "Content-Encoding" not in response.headers
+
+
+async def test_byte_ranges(client, log_file):
+    size = log_file.stat().st_size
+
+    partial = await client.get("/logs", headers={"Range": "bytes=0-9"})
+    suffix = await client.get("/logs", headers={"Range": "bytes=-5"})
+    unsatisfiable = await client.get("/logs", headers={"Range": f"bytes={size}-"})
+
+    assert partial.status_code == 206
+    assert partial.content == log_file.read_bytes()[:10]
+    assert partial.headers["Content-Range"] == f"bytes 0-9/{size}"
+    assert suffix.content == log_file.read_bytes()[-5:]
+    assert unsatisfiable.status_code == 416
+
+
+async def test_gzip_when_accepted(client, log_file):
+    async with client.stream("GET", "/logs", params={"tail": 2}, headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join([chunk async for chunk in response.aiter_raw()])
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(raw).decode() == "".join(RECORDS[-2:])
+
+
+async def test_tail_spans_the_rotated_backups(client, log_file):
+    response = await client.get("/logs", params={"tail": 5})
+
+    assert response.text == "".join(RECORDS)
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"level": "warning"}, RECORDS[1:4]),
+    ({"grep": "start|stop"}, [RECORDS[0], RECORDS[4]]),
+    ({"since": "2024-05-01T10:05:00", "until": "2024-05-01T10:10:00"}, RECORDS[1:4]),
+    ({"level": "INFO", "tail": 1}, RECORDS[4:]),
+])
+async def test_filters_keep_whole_records(client, log_file, params, expected):
+    response = await client.get("/logs", params=params)
+
+    assert response.status_code == 200
+    assert response.text == "".join(expected)
+
+
+@pytest.mark.parametrize("params", [{"grep": "("}, {"level": "loud"}])
+async def test_invalid_filters_are_rejected(client, log_file, params):
+    assert (await client.get("/logs", params=params)).status_code == 400
+
+
+async def test_missing_log_is_not_found(client, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.main.LOG_FILE", str(tmp_path / "missing.log"))
+
+    assert (await client.get("/logs")).status_code == 404
@@ -0,0 +1,41 @@
+import re
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def sample(metrics: str, name: str, **labels: str) -> float:
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    series = f"{name}{{{selector}}}" if labels else name
+    match = re.search(rf"^{re.escape(series)} (\S+)$", metrics, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+async def test_requests_are_counted_by_route_template_and_status(client):
+    before = (await client.get("/metrics")).text
+
+    await client.post("/files/CreateFile/", json={"name": "report", "risk": 1})
+    await client.get("/files/GetFileByID/1")
+    await client.get("/files/GetFileByID/2")
+
+    metrics = (await client.get("/metrics")).text
+    route = "/files/GetFileByID/{file_id}"
+    assert sample(metrics, "http_requests_total", method="GET", route=route, status="200") \
+        - sample(before, "http_requests_total", method="GET", route=route, status="200") == 1
+    assert sample(metrics, "http_requests_total", method="GET", route=route, status="404") \
+        - sample(before, "http_requests_total", method="GET", route=route, status="404") == 1
+    assert "/files/GetFileByID/1" not in metrics
+
+
+async def test_latency_histogram_is_cumulative(client):
+    await client.get("/")
+
+    metrics = (await client.get("/metrics")).text
+    buckets = [float(value) for value in re.findall(
+        r'^http_request_duration_seconds_bucket\{method="GET",route="/",le="[^"]+"\} (\S+)$', metrics, re.MULTILINE)]
+
+    assert buckets and buckets == sorted(buckets)
+    assert buckets[-1] == sample(metrics, "http_request_duration_seconds_count", method="GET", route="/")
+    # The /metrics request itself is being served.
+    assert sample(metrics, "http_requests_in_flight") == 1
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.database.database import engine
+from app.utils.profiling import QueryStats, current_query_stats
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_failed_statements_are_counted_and_leave_no_timer_behind():
+    stats = QueryStats({"path": "/test"})
+    token = current_query_stats.set(stats)
+
+    try:
+        async with engine.connect() as connection:
+            with pytest.raises((OperationalError, ProgrammingError)):
+                await connection.execute(text("SELECT * FROM missing_table"))
+
+            assert "query_started" not in connection.sync_connection.info
+
+            await connection.rollback()
+            await connection.execute(text("SELECT 1"))
+    finally:
+        current_query_stats.reset(token)
+        # Pooled connections belong to this test's event loop.
+        await engine.dispose()
+
+    assert stats.queries == 2
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import insert
+
+from app.database.database import SessionLocal
+from app.models import File, Group, User, file_group, file_user, user_group
+
+pytestmark = pytest.mark.anyio
+
+# Small enough that every relationship fits in one selectinload IN batch (500).
+ROWS = 20
+
+
+async def seed(rows: int):
+    """Insert `rows` users, groups and files, each file shared with two users and a group."""
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": i, "name": f"user{i}"} for i in range(1, rows + 1)])
+        await db.execute(insert(Group), [{"id": i, "name": f"group{i}"} for i in range(1, rows + 1)])
+        await db.execute(insert(File), [{"id": i, "name": f"file{i}", "risk": i % 101} for i in range(1, rows + 1)])
+        await db.execute(insert(user_group), [{"user_id": i, "group_id": i} for i in range(1, rows + 1)])
+        await db.execute(insert(file_user), [{"file_id": i, "user_id": user_id}
+                                             for i in range(1, rows + 1) for user_id in {i, rows + 1 - i}])
+        await db.execute(insert(file_group), [{"file_id": i, "group_id": i} for i in range(1, rows + 1)])
+        await db.commit()
+
+
+@pytest.mark.parametrize("rows", [ROWS, 10 * ROWS])
+@pytest.mark.parametrize("route, expected_queries", [
+    ("/files/GetAllFiles/", 3),  # files, then one IN query each for users and groups
+    ("/groups/GetAllGroups/", 2),  # groups, then one IN query for their users
+    ("/users/GetAllUsers/", 1),
+])
+async def test_list_query_count_does_not_grow_with_rows(client, queries, route, expected_queries, rows):
+    await seed(rows)
+    queries.reset()
+
+    response = await client.get(route)
+
+    assert response.status_code == 200
+    assert len(response.json()) == rows
+    assert queries.count == expected_queries
+
+
+async def test_list_relationships_are_loaded(client, queries):
+    await seed(ROWS)
+
+    files = (await client.get("/files/GetAllFiles/")).json()
+    groups = (await client.get("/groups/GetAllGroups/")).json()
+
+    assert files[0] == {"name": "file1", "risk": 1, "users": [{"id": 1}, {"id": ROWS}], "groups": [{"id": 1}]}
+    assert groups[0]["users"] == [{"id": 1, "name": "user1"}]
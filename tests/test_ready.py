@@ -0,0 +1,27 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_ready_once_started(client):
+    response = await client.get("/ready")
+
+    assert response.status_code == 200
+    state = response.json()
+    assert state["status"] == "READY"
+    assert state["database"] is True
+    assert state["schema"] == "created"
+    assert state["pool"]["warmed"] == state["pool"]["target"]
+    assert state["share_sketches"] is True and state["access_index"] is True
+
+
+async def test_not_ready_outside_the_lifespan(empty_database):
+    # Requests are served without running startup, as they would be after shutdown.
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+        response = await client.get("/ready")
+
+    assert response.status_code == 503
+    assert response.json()["status"] != "READY"
@@ -0,0 +1,62 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+# (name, risk) in creation order, so file IDs are 1..6.
+FILES = [("a", 50), ("b", 10), ("c", 50), ("d", 90), ("e", 0), ("f", 10)]
+
+
+@pytest.fixture
+async def files(client):
+    body = "name,risk\n" + "".join(f"{name},{risk}\n" for name, risk in FILES)
+    await client.post("/files/BulkCreateFiles/", content=body, headers={"Content-Type": "text/csv"})
+
+
+async def pages(client, params: dict) -> list:
+    """Follow the keyset cursor headers and return the names of every page; a full page always has a next one."""
+    names, params = [], dict(params)
+    while True:
+        response = await client.get("/files/GetAllFiles/", params=params)
+        assert response.status_code == 200
+        names.append([file["name"] for file in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            return names
+        params["after_id"] = response.headers["X-Next-Cursor"]
+        if "X-Next-Risk" in response.headers:
+            params["after_risk"] = response.headers["X-Next-Risk"]
+
+
+async def test_risk_range_filter(client, files):
+    response = await client.get("/files/GetAllFiles/", params={"min_risk": 10, "max_risk": 50})
+
+    assert [file["name"] for file in response.json()] == ["a", "b", "c", "f"]
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("risk", [["e", "b"], ["f", "a"], ["c", "d"], []]),
+    ("-risk", [["d", "c"], ["a", "f"], ["b", "e"], []]),
+    ("id", [["a", "b"], ["c", "d"], ["e", "f"], []]),
+])
+async def test_keyset_pages_follow_the_sort(client, files, sort, expected):
+    assert await pages(client, {"sort": sort, "limit": 2}) == expected
+
+
+async def test_risk_keyset_combines_with_the_filter(client, files):
+    assert await pages(client, {"sort": "-risk", "limit": 2, "min_risk": 10}) == [["d", "c"], ["a", "f"], ["b"]]
+
+
+@pytest.mark.parametrize("params", [{"sort": "id", "after_risk": 10},
+                                    {"sort": "risk", "after_id": 1}])
+async def test_inconsistent_cursors_are_rejected(client, files, params):
+    assert (await client.get("/files/GetAllFiles/", params=params)).status_code == 400
+
+
+async def test_risk_histogram_counts_every_bucket(client, files):
+    response = await client.get("/files/RiskHistogram", params={"bucket_size": 50})
+
+    assert response.status_code == 200
+    assert response.json() == {"bucket_size": 50, "total": 6, "buckets": [
+        {"min_risk": 0, "max_risk": 49, "files": 3},
+        {"min_risk": 50, "max_risk": 99, "files": 3},
+        {"min_risk": 100, "max_risk": 100, "files": 0},
+    ]}
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.database.database import SessionLocal
+from app.database.operations.share_counts import rebuild_share_counts_db
+from app.models import File, Group, User
+
+pytestmark = pytest.mark.anyio
+
+USERS, GROUPS, FILES = 12, 4, 6
+STEPS = 150
+
+
+async def seed():
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"id": i, "name": f"user{i}"} for i in range(1, USERS + 1)])
+        await db.execute(insert(Group), [{"id": i, "name": f"group{i}"} for i in range(1, GROUPS + 1)])
+        await db.execute(insert(File), [{"id": i, "name": f"file{i}", "risk": 10 * i} for i in range(1, FILES + 1)])
+        await db.commit()
+
+
+def random_share(rng: random.Random):
+    """Return the request for one random direct, group or membership share, single or batched."""
+    file_id, group_id = rng.randint(1, FILES), rng.randint(1, GROUPS)
+    user_ids = rng.sample(range(1, USERS + 1), rng.randint(1, 4))
+
+    return rng.choice([
+        ("/files/ShareFileWithUser/", {"params": {"file_id": file_id, "user_id": user_ids[0], "slim": True}}),
+        ("/files/ShareFileWithGroup/", {"params": {"file_id": file_id, "group_id": group_id, "slim": True}}),
+        ("/groups/ShareGroupWithUser/", {"params": {"group_id": group_id, "user_id": user_ids[0], "slim": True}}),
+        ("/files/ShareFileWithUsers/", {"json": {"file_id": file_id, "user_ids": user_ids}}),
+        ("/files/ShareFileWithGroups/", {"json": {"file_id": file_id,
+                                                  "group_ids": rng.sample(range(1, GROUPS + 1), 2)}}),
+        ("/groups/ShareGroupWithUsers/", {"json": {"group_id": group_id, "user_ids": user_ids}}),
+    ])
+
+
+async def read_counters(db):
+    rows = await db.execute(select(File.id, File.shared_users_count, File.exposure).order_by(File.id))
+    return rows.all()
+
+
+@pytest.mark.parametrize("seed_value", [1, 2, 3])
+async def test_maintained_counters_match_a_rebuild(client, seed_value):
+    await seed()
+    rng = random.Random(seed_value)
+
+    for _ in range(STEPS):
+        route, request = random_share(rng)
+        response = await client.post(route, **request)
+        # Single shares answer a repeated share with 400 and change nothing.
+        assert response.status_code in (200, 400), response.text
+
+    async with SessionLocal() as db:
+        maintained = await read_counters(db)
+        await rebuild_share_counts_db(db)
+        rebuilt = await read_counters(db)
+        await db.rollback()
+
+    assert maintained == rebuilt
+    assert any(shared_users_count for _, shared_users_count, _ in maintained)
@@ -0,0 +1,81 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create(client, kind: str, records: str) -> list:
+    response = await client.post(f"/{kind}/BulkCreate{kind.capitalize()}/", content=records,
+                                 headers={"Content-Type": "text/csv"})
+    return response.json()["ids"]
+
+
+@pytest.fixture
+async def entities(client):
+    """Two users, a group holding the first one, and a file."""
+    users = await create(client, "users", "name\nada\nbob\n")
+    groups = await create(client, "groups", "name\nteam\n")
+    files = await create(client, "files", "name,risk\nreport,40\n")
+    await client.post("/groups/ShareGroupWithUser/", params={"group_id": groups[0], "user_id": users[0]})
+    return users, groups, files
+
+
+async def test_share_file_with_user_returns_the_file(client, entities):
+    users, _, files = entities
+
+    response = await client.post("/files/ShareFileWithUser/", params={"file_id": files[0], "user_id": users[1]})
+
+    assert response.status_code == 200
+    assert response.json() == {"name": "report", "risk": 40, "users": [{"id": users[1]}], "groups": []}
+
+
+async def test_slim_share_returns_an_acknowledgement(client, entities):
+    _, groups, files = entities
+
+    response = await client.post("/files/ShareFileWithGroup/",
+                                 params={"file_id": files[0], "group_id": groups[0], "slim": True})
+
+    assert response.status_code == 200
+    assert response.json() == {"id": files[0], "shared_with_id": groups[0], "status": "added"}
+
+
+async def test_repeated_single_share_is_rejected(client, entities):
+    users, _, files = entities
+    params = {"file_id": files[0], "user_id": users[0], "slim": True}
+
+    assert (await client.post("/files/ShareFileWithUser/", params=params)).status_code == 200
+    assert (await client.post("/files/ShareFileWithUser/", params=params)).status_code == 400
+
+
+async def test_share_with_missing_entities_is_not_found(client, entities):
+    users, _, files = entities
+
+    assert (await client.post("/files/ShareFileWithUser/",
+                              params={"file_id": 999, "user_id": users[0]})).status_code == 404
+    assert (await client.post("/files/ShareFileWithUser/",
+                              params={"file_id": files[0], "user_id": 999})).status_code == 404
+
+
+async def test_batch_share_reports_each_id(client, entities):
+    users, _, files = entities
+    await client.post("/files/ShareFileWithUser/", params={"file_id": files[0], "user_id": users[0]})
+
+    response = await client.post("/files/ShareFileWithUsers/",
+                                 json={"file_id": files[0], "user_ids": [users[0], users[1], 999]})
+
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": users[0], "status": "already_shared"},
+                                           {"id": users[1], "status": "added"},
+                                           {"id": 999, "status": "not_found"}]}
+
+
+async def test_batch_group_shares(client, entities):
+    users, groups, files = entities
+
+    shared = await client.post("/files/ShareFileWithGroups/", json={"file_id": files[0], "group_ids": [groups[0], 999]})
+    joined = await client.post("/groups/ShareGroupWithUsers/", json={"group_id": groups[0], "user_ids": users})
+
+    assert shared.json() == {"results": [{"id": groups[0], "status": "added"}, {"id": 999, "status": "not_found"}]}
+    assert joined.json() == {"results": [{"id": users[0], "status": "already_shared"},
+                                         {"id": users[1], "status": "added"}]}
+    assert (await client.post("/files/ShareFileWithGroups/",
+                              json={"file_id": 999, "group_ids": [groups[0]]})).status_code == 404
@@ -0,0 +1,13 @@
+from app.utils.sketches import HeavyHitters
+
+
+def test_eviction_removes_the_smallest_count_after_a_decrease():
+    heavy_hitters = HeavyHitters(3)
+    for key, count in [(1, 10), (2, 20), (3, 30)]:
+        heavy_hitters.offer(key, count)
+
+    heavy_hitters.offer(4, 5)  # smaller than everything, not admitted; caches key 1 as the minimum
+    heavy_hitters.offer(3, 2)  # key 3 drops below key 1
+    heavy_hitters.offer(5, 15)
+
+    assert dict(heavy_hitters.top(3)) == {1: 10, 2: 20, 5: 15}
@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("route", ["/files/GetAllFiles/", "/groups/GetAllGroups/", "/users/GetAllUsers/"])
+@pytest.mark.parametrize("fast", [False, True])
+async def test_stream_uses_a_single_connection(client, checkouts, route, fast):
+    await client.post("/users/CreateUser/", json={"name": "user"})
+    await client.post("/groups/CreateGroup/", json={"name": "group"})
+    await client.post("/files/CreateFile/", json={"name": "file", "risk": 1})
+
+    checkouts.reset()
+    response = await client.get(route, params={"stream": True, "fast": fast})
+
+    assert response.status_code == 200
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 1
+    # Only the generator's own session; the route itself takes no connection.
+    assert checkouts.count == 1
@@ -0,0 +1,52 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def exposed(client):
+    """Files with exposure 3 * 20, 2 * 30, 1 * 50 and an unshared one."""
+    await client.post("/users/BulkCreateUsers/", content="name\na\nb\nc\n", headers={"Content-Type": "text/csv"})
+    await client.post("/groups/CreateGroup/", json={"name": "team"})
+    await client.post("/groups/ShareGroupWithUsers/", json={"group_id": 1, "user_ids": [2, 3]})
+    await client.post("/files/BulkCreateFiles/", content="name,risk\nlow,20\nmid,30\nhigh,50\nnone,99\n",
+                      headers={"Content-Type": "text/csv"})
+
+    await client.post("/files/ShareFileWithUsers/", json={"file_id": 1, "user_ids": [1]})
+    await client.post("/files/ShareFileWithGroups/", json={"file_id": 1, "group_ids": [1]})
+    await client.post("/files/ShareFileWithUsers/", json={"file_id": 2, "user_ids": [1, 2]})
+    await client.post("/files/ShareFileWithUser/", params={"file_id": 3, "user_id": 3})
+
+
+async def test_files_are_ranked_by_exposure_then_id_descending(client, exposed):
+    response = await client.get("/files/TopExposed/10")
+
+    assert response.status_code == 200
+    assert [(file["name"], file["shared_users_count"], file["exposure"]) for file in response.json()] == [
+        ("mid", 2, 60), ("low", 3, 60), ("high", 1, 50)]
+
+
+async def test_exposure_follows_group_membership(client, exposed):
+    await client.post("/groups/ShareGroupWithUser/", params={"group_id": 1, "user_id": 1})
+    await client.post("/files/ShareFileWithGroup/", params={"file_id": 3, "group_id": 1})
+
+    top = (await client.get("/files/TopExposed/1")).json()
+
+    assert (top[0]["name"], top[0]["exposure"]) == ("high", 150)
+
+
+async def test_exposure_pages_follow_the_cursor(client, exposed):
+    first = await client.get("/files/TopExposed/2")
+    second = await client.get("/files/TopExposed/2", params={
+        "after_id": first.headers["X-Next-Cursor"], "after_exposure": first.headers["X-Next-Exposure"]})
+
+    assert [file["name"] for file in first.json()] == ["mid", "low"]
+    assert [file["name"] for file in second.json()] == ["high"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+async def test_min_risk_and_cursor_validation(client, exposed):
+    filtered = await client.get("/files/TopExposed/10", params={"min_risk": 30})
+
+    assert [file["name"] for file in filtered.json()] == ["mid", "high"]
+    assert (await client.get("/files/TopExposed/10", params={"after_id": 1})).status_code == 400
@@ -0,0 +1,49 @@
+import pytest
+
+from app.database.operations.share_sketches import share_sketches
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_approximate_top_skips_files_the_session_cannot_see(client):
+    user = (await client.post("/users/CreateUser/", json={"name": "user"})).json()
+    file = (await client.post("/files/CreateFile/", json={"name": "file", "risk": 5})).json()
+    await client.post("/files/ShareFileWithUser/", params={"file_id": 1, "user_id": user["id"]})
+
+    # A file the sketches know about but this database does not, as on a lagging replica.
+    share_sketches.add_file_users(10 ** 6, range(1, 100))
+
+    response = await client.get("/files/TopSharedFiles/5", params={"approximate": True})
+
+    assert response.status_code == 200
+    assert [estimate["name"] for estimate in response.json()["files"]] == [file["name"]]
+
+
+@pytest.fixture
+async def shared(client):
+    """file1 reaches 3 users (one directly, two through a group), file2 one user, file3 none."""
+    await client.post("/users/BulkCreateUsers/", content="name\na\nb\nc\n", headers={"Content-Type": "text/csv"})
+    await client.post("/groups/CreateGroup/", json={"name": "team"})
+    await client.post("/groups/ShareGroupWithUsers/", json={"group_id": 1, "user_ids": [2, 3]})
+    await client.post("/files/BulkCreateFiles/", content="name,risk\nfile1,1\nfile2,2\nfile3,3\n",
+                      headers={"Content-Type": "text/csv"})
+    await client.post("/files/ShareFileWithUser/", params={"file_id": 1, "user_id": 1})
+    await client.post("/files/ShareFileWithGroup/", params={"file_id": 1, "group_id": 1})
+    await client.post("/files/ShareFileWithUser/", params={"file_id": 2, "user_id": 3})
+
+
+async def test_exact_top_lists_the_reached_users(client, shared):
+    response = await client.get("/files/TopSharedFiles/2")
+
+    assert response.status_code == 200
+    assert [(file["name"], sorted(file["users"])) for file in response.json()] == [
+        ("file1", ["a", "b", "c"]), ("file2", ["c"])]
+
+
+async def test_approximate_top_estimates_small_counts_exactly(client, shared):
+    response = await client.get("/files/TopSharedFiles/2", params={"approximate": True})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["relative_error"] > 0
+    assert [(file["name"], file["estimated_users_count"]) for file in body["files"]] == [("file1", 3), ("file2", 1)]
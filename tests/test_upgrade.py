@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, String, Table, inspect, insert, select
+
+from app.database.database import create_database, engine
+from app.models import File, file_risk_count
+
+pytestmark = pytest.mark.anyio
+
+# The tables as the first release created them, before any derived columns.
+baseline = MetaData()
+Table("user", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("name", String))
+Table("group", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("name", String))
+Table("file", baseline,
+      Column("id", Integer, primary_key=True, index=True),
+      Column("name", String),
+      Column("risk", Integer))
+Table("user_group", baseline,
+      Column("user_id", Integer, ForeignKey("user.id"), primary_key=True),
+      Column("group_id", Integer, ForeignKey("group.id"), primary_key=True))
+Table("file_user", baseline,
+      Column("file_id", Integer, ForeignKey("file.id"), primary_key=True),
+      Column("user_id", Integer, ForeignKey("user.id"), primary_key=True))
+Table("file_group", baseline,
+      Column("file_id", Integer, ForeignKey("file.id"), primary_key=True),
+      Column("group_id", Integer, ForeignKey("group.id"), primary_key=True))
+
+
+async def create_baseline():
+    """Create the baseline schema with file 1 shared with user 1 and with group 1 (users 1 and 2)."""
+    tables = baseline.tables
+    async with engine.begin() as connection:
+        await connection.run_sync(baseline.create_all)
+        await connection.execute(insert(tables["user"]), [{"id": i, "name": f"user{i}"} for i in (1, 2, 3)])
+        await connection.execute(insert(tables["group"]), [{"id": 1, "name": "group1"}])
+        await connection.execute(insert(tables["file"]), [{"id": i, "name": f"file{i}", "risk": 10 * i}
+                                                          for i in (1, 2)])
+        await connection.execute(insert(tables["user_group"]), [{"user_id": 1, "group_id": 1},
+                                                                {"user_id": 2, "group_id": 1}])
+        await connection.execute(insert(tables["file_user"]), [{"file_id": 1, "user_id": 1}])
+        await connection.execute(insert(tables["file_group"]), [{"file_id": 1, "group_id": 1}])
+
+
+def _schema(connection):
+    inspector = inspect(connection)
+    return {table: ({column["name"] for column in inspector.get_columns(table)},
+                    {index["name"] for index in inspector.get_indexes(table)})
+            for table in inspector.get_table_names()}
+
+
+async def read_schema():
+    async with engine.connect() as connection:
+        return await connection.run_sync(_schema)
+
+
+async def read_files():
+    async with engine.connect() as connection:
+        rows = await connection.execute(select(File.id, File.shared_users_count, File.exposure).order_by(File.id))
+        return rows.all()
+
+
+async def test_upgrade_adds_share_counts_and_exposure_to_a_baseline_database(empty_database):
+    await create_baseline()
+
+    await create_database()
+
+    columns, indexes = (await read_schema())["file"]
+    assert {"shared_users_count", "exposure"} <= columns
+    assert {"ix_file_shared_users_count", "ix_file_exposure_id"} <= indexes
+    assert await read_files() == [(1, 2, 20), (2, 0, 0)]
+
+
+async def test_upgrade_adds_the_risk_index_and_histogram(empty_database):
+    await create_baseline()
+
+    await create_database()
+
+    assert "ix_file_risk_id" in (await read_schema())["file"][1]
+    async with engine.connect() as connection:
+        histogram = (await connection.execute(select(file_risk_count).order_by(file_risk_count.c.risk))).all()
+    assert histogram == [(10, 1), (20, 1)]
+
+
+async def test_upgrade_adds_the_reverse_lookup_indexes(empty_database):
+    await create_baseline()
+
+    await create_database()
+
+    schema = await read_schema()
+    assert "ix_file_user_user_id" in schema["file_user"][1]
+    assert "ix_file_group_group_id" in schema["file_group"][1]
+    assert "ix_user_group_group_id" in schema["user_group"][1]
+
+
+async def test_upgrade_is_idempotent(empty_database):
+    await create_baseline()
+    await create_database()
+    schema = await read_schema()
+
+    await create_database()
+
+    assert await read_schema() == schema
+    assert await read_files() == [(1, 2, 20), (2, 0, 0)]